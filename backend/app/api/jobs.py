@@ -0,0 +1,127 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse
+import asyncio
+import os
+from typing import Optional, Dict, Callable
+from app.api.routes import generate_topic_presentation, generate_pdf_presentation, save_upload, busy_error
+from app.services.job_runner import job_runner
+from app.services.job_store import QUEUED, RUNNING, SUCCEEDED, FAILED
+from app.services.worker_pool import PoolSaturatedError, cpu_pool
+from app.services.instrumentation import start_trace
+
+router = APIRouter()
+
+async def run_topic_job(params: Dict, report: Callable) -> Dict:
+    start_trace()
+    return await generate_topic_presentation(**params, report=report)
+
+async def run_pdf_job(params: Dict, report: Callable) -> Dict:
+    start_trace()
+    try:
+        result = await generate_pdf_presentation(**params, report=report)
+    except (PoolSaturatedError, asyncio.CancelledError):
+        # The job runs again later and still needs its upload
+        raise
+    except Exception:
+        if os.path.exists(params["upload_path"]):
+            os.remove(params["upload_path"])
+        raise
+
+    os.remove(params["upload_path"])
+    return result
+
+job_runner.register("topic", run_topic_job)
+job_runner.register("pdf", run_pdf_job)
+
+def job_view(job: Dict) -> Dict:
+    """Public view of a job (params hold server-side paths, so they stay out)"""
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job["finished_at"],
+        "status_url": f"/api/jobs/{job['id']}"
+    }
+
+def accepted(job: Dict) -> JSONResponse:
+    return JSONResponse(status_code=202, content=job_view(job), headers={"Location": f"/api/jobs/{job['id']}"})
+
+@router.post("/jobs/generate-from-topic")
+async def create_topic_job(
+    topic: str = Form(...),
+    num_slides: int = Form(10),
+    template: str = Form("executive"),
+    color_scheme: str = Form("ocean"),
+    custom_prompt: Optional[str] = Form(None),
+    use_images: bool = Form(False),
+    generate_pdf: bool = Form(False)
+):
+    """Queue a topic presentation; poll the returned status_url for the result"""
+    try:
+        job = await job_runner.submit("topic", {
+            "topic": topic,
+            "num_slides": num_slides,
+            "template": template,
+            "color_scheme": color_scheme,
+            "custom_prompt": custom_prompt,
+            "use_images": use_images,
+            "generate_pdf": generate_pdf
+        })
+    except PoolSaturatedError as e:
+        raise busy_error(e)
+    return accepted(job)
+
+@router.post("/jobs/generate-from-pdf")
+async def create_pdf_job(
+    file: UploadFile = File(...),
+    slides_per_chapter: int = Form(10),
+    template: str = Form("executive"),
+    color_scheme: str = Form("ocean"),
+    custom_prompt: Optional[str] = Form(None),
+    use_images: bool = Form(False),
+    generate_pdf: bool = Form(False)
+):
+    """Queue a PDF presentation; the upload is kept until the job finishes"""
+    try:
+        upload_path, upload_sha256 = await cpu_pool.run(save_upload, file.file, file.filename)
+    except PoolSaturatedError as e:
+        raise busy_error(e)
+
+    try:
+        job = await job_runner.submit("pdf", {
+            "upload_path": upload_path,
+            "upload_sha256": upload_sha256,
+            "original_filename": file.filename,
+            "slides_per_chapter": slides_per_chapter,
+            "template": template,
+            "color_scheme": color_scheme,
+            "custom_prompt": custom_prompt,
+            "use_images": use_images,
+            "generate_pdf": generate_pdf
+        })
+    except PoolSaturatedError as e:
+        os.remove(upload_path)
+        raise busy_error(e)
+    return accepted(job)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress stage and - once finished - the result or error"""
+    job = await asyncio.to_thread(job_runner.store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+@router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Most recent jobs first, optionally filtered by status"""
+    if status and status not in (QUEUED, RUNNING, SUCCEEDED, FAILED):
+        raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+    jobs = await asyncio.to_thread(job_runner.store.list, status, min(max(limit, 1), 500))
+    return {"jobs": [job_view(job) for job in jobs]}
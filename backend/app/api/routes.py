@@ -1,12 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+import asyncio
 import os
-import shutil
-from typing import Optional
-from app.services.pdf_processor import PDFProcessor
+import json
+import hashlib
+from typing import Optional, List, Dict, Iterator, Tuple, Callable
 from app.services.ai_generator import AIGenerator
-from app.services.pptx_generator import PPTXGenerator
-from app.utils.helpers import generate_unique_filename, ensure_dir
+from app.services.model_registry import model_registry, ModelNotReadyError
+from app.services.batch_scheduler import topic_scheduler
+from app.services.slide_cache import slide_cache, cache_key, normalize_text
+from app.services.extraction_cache import extraction_cache, extraction_key
+from app.services.single_flight import topic_flights, pdf_flights
+from app.services.worker_pool import PoolSaturatedError, inference_pool, cpu_pool, process_pool_stats
+from app.services.job_runner import job_runner
+from app.services.instrumentation import start_trace, stage, timings
+from app.utils.helpers import generate_unique_filename, ensure_dir, file_sha256
 from app.services.pdf_converter import PDFConverter
 
 router = APIRouter()
@@ -42,70 +50,365 @@ COLOR_MAPPING = {
     'violet': 'purple'
 }
 
-@router.post("/generate-from-topic")
-async def generate_from_topic(
-    topic: str = Form(...),
-    num_slides: int = Form(10),
-    template: str = Form("executive"),
-    color_scheme: str = Form("ocean"),
-    custom_prompt: Optional[str] = Form(None),
-    use_images: bool = Form(False),
-    generate_pdf: bool = Form(False)
-):
-    """Generate presentation from topic - MAX 10 SLIDES"""
+def get_ai_generator() -> AIGenerator:
+    """Shared generator from the registry - 503 until the model is warm"""
     try:
-        # Enforce maximum of 10 slides
-        num_slides = min(num_slides, 10)
+        return model_registry.get_generator()
+    except ModelNotReadyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{e}, try again shortly",
+            headers={"Retry-After": "10"}
+        )
+
+def busy_error(e: PoolSaturatedError) -> HTTPException:
+    """503 telling the client when a worker is likely free"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def save_upload(file, filename: str) -> Tuple[str, str]:
+    """Copy an uploaded file into UPLOAD_DIR, return its path and sha256.
+
+    Starlette has already spooled the request body to a temp file, so the
+    hash isn't taken as the upload streams in but in the same pass that
+    copies the spooled file here - no separate read just for hashing.
+    """
+    upload_path = os.path.join(UPLOAD_DIR, generate_unique_filename(filename))
+    digest = hashlib.sha256()
+    with stage("upload") as counts, open(upload_path, "wb") as buffer:
+        counts["bytes"] = 0
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+            buffer.write(chunk)
+            counts["bytes"] += len(chunk)
+    return upload_path, digest.hexdigest()
+
+def extract_chapters(upload_path: str, upload_sha256: Optional[str] = None) -> List[Dict]:
+    """Text extraction (with OCR fallback) and chapter detection.
+    
+    With the upload's sha256, a file processed before (with the same
+    extractor settings) comes straight from the extraction cache.
+    """
+    # PyMuPDF/pdf2image/pytesseract load on first use, not at server start
+    from app.services.pdf_processor import PDFProcessor, SOURCE_OCR, extraction_settings
+    
+    key = extraction_key(upload_sha256, extraction_settings()) if upload_sha256 else None
+    if key:
+        with stage("extraction_cache") as counts:
+            cached = extraction_cache.get(key)
+            counts["hits"] = int(cached is not None)
+        if cached is not None:
+            print(f"♻️  Reusing extracted text: {len(cached['pages'])} pages, {len(cached['chapters'])} chapters")
+            return cached["chapters"]
+    
+    with stage("text_extraction") as counts:
+        pdf_processor = PDFProcessor(upload_path)
+        pages_text = pdf_processor.extract_text_by_pages()
+        counts["pages"] = len(pages_text)
+        counts["ocr_pages"] = pdf_processor.page_sources.count(SOURCE_OCR)
+    with stage("chapter_detection") as counts:
+        chapters = pdf_processor.detect_chapters(pages_text)
+        counts["chapters"] = len(chapters)
+    
+    # An empty result may be a failed OCR run - let the next upload retry
+    if key and any(text.strip() for text in pages_text):
+        extraction_cache.put(key, {"pages": pages_text, "sources": pdf_processor.page_sources, "chapters": chapters})
+    return chapters
+
+# ENFORCE MAXIMUM 10 SLIDES TOTAL for PDF decks
+MAX_TOTAL_SLIDES = 10
+
+def chapter_slide_budget(num_chapters: int) -> Tuple[int, bool]:
+    """Content slides per chapter and whether to add dividers"""
+    # If only 1 chapter, use all 10 slides for content
+    if num_chapters == 1:
+        return MAX_TOTAL_SLIDES, False
+    
+    # Reserve slides for dividers, distribute rest
+    available_for_content = MAX_TOTAL_SLIDES - num_chapters
+    return max(1, available_for_content // num_chapters), True
+
+def make_divider_slide(chapter_idx: int, chapter_title: str) -> Dict:
+    """Section slide shown before each chapter's content"""
+    return {
+        "title": f"Chapter {chapter_idx}",
+        "content": [
+            chapter_title,
+            "Key topics in this chapter"
+        ],
+        "visual_note": f"Chapter {chapter_idx}",
+        "is_chapter_divider": True,
+        "needs_image": True,
+        "image_query": chapter_title
+    }
+
+def plan_pdf_slides(chapters: List[Dict], slides_per_chapter: int, include_dividers: bool, max_total: int) -> List[Dict]:
+    """Decide how many content slides each chapter gets before generating anything"""
+    plan = []
+    planned_total = 0
+    
+    for chapter_idx, chapter in enumerate(chapters, 1):
+        # STOP if we're at limit
+        if planned_total >= max_total:
+            print(f"\n⚠️  Reached slide limit ({max_total}), skipping remaining chapters")
+            break
         
-        backend_template = TEMPLATE_MAPPING.get(template, 'modern')
-        backend_color = COLOR_MAPPING.get(color_scheme, 'blue')
+        if include_dividers:
+            planned_total += 1
         
-        print(f"\n🎨 Frontend → Backend Mapping:")
-        print(f"   Template: {template} → {backend_template}")
-        print(f"   Color: {color_scheme} → {backend_color}")
-        print(f"   Slides: {num_slides} (max 10)")
-        print(f"   🖼️  Images: {'ENABLED' if use_images else 'DISABLED'}")
-        print(f"   📄 PDF: {'ENABLED' if generate_pdf else 'DISABLED'}")
+        num_slides = min(slides_per_chapter, max_total - planned_total)
+        planned_total += max(0, num_slides)
         
-        ai_generator = AIGenerator()
-        slides = ai_generator.generate_slides_from_topic(topic, num_slides, custom_prompt)
+        plan.append({
+            "content": chapter["content"],
+            "title": chapter["title"],
+            "num_slides": max(0, num_slides),
+            "chapter_number": chapter_idx
+        })
+    
+    return plan
+
+def assemble_pdf_slides(plan: List[Dict], chapter_slides: Iterator[List[Dict]], include_dividers: bool, max_total: int) -> List[Dict]:
+    """Interleave chapter dividers with generated slides, cap and renumber"""
+    all_slides = []
+    
+    for entry in plan:
+        chapter_idx = entry["chapter_number"]
+        
+        print(f"\n{'─'*70}")
+        print(f"📖 CHAPTER {chapter_idx}/{len(plan)}: {entry['title']}")
+        print(f"{'─'*70}")
+        
+        # Add chapter divider (only if multiple chapters)
+        if include_dividers:
+            all_slides.append(make_divider_slide(chapter_idx, entry['title']))
+            print(f"   ✅ Chapter {chapter_idx} divider added")
+        
+        if entry["num_slides"] <= 0:
+            print(f"   ⚠️  No capacity left")
+            continue
+        
+        added_count = 0
+        for slide in next(chapter_slides):
+            # STOP if we hit limit
+            if len(all_slides) >= max_total:
+                print(f"   ⚠️  Hit slide limit")
+                break
+            
+            all_slides.append(slide)
+            print(f"   ✅ Added: {slide['title']}")
+            added_count += 1
         
+        print(f"   📊 Added {added_count} slides | Total: {len(all_slides)}/{max_total}")
+    
+    # Slides were generated per chapter, so number the deck as a whole
+    all_slides = all_slides[:max_total]
+    for slide_number, slide in enumerate(all_slides, 1):
+        slide["slide_number"] = slide_number
+    
+    return all_slides
+
+def build_presentation(slides: List[Dict], presentation_title: str, filename_hint: str, backend_template: str, backend_color: str, use_images: bool, generate_pdf: bool) -> Tuple[str, Optional[str]]:
+    """Render the PPTX (and optional PDF), return their filenames"""
+    from app.services.pptx_generator import PPTXGenerator
+    
+    output_filename = generate_unique_filename(filename_hint)
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    
+    with stage("pptx_build", slides=len(slides)):
         pptx_generator = PPTXGenerator(
             template=backend_template, 
             color_scheme=backend_color,
             use_images=use_images
         )
-        output_filename = generate_unique_filename(f"{topic}.pptx")
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        
         pptx_generator.generate_presentation(
             slides_data=slides,
-            presentation_title=topic,
+            presentation_title=presentation_title,
             output_path=output_path
         )
-        
-        # Generate PDF if requested
-        pdf_filename = None
-        if generate_pdf:
+    
+    # Generate PDF if requested
+    pdf_filename = None
+    if generate_pdf:
+        with stage("pdf_conversion"):
             pdf_path = PDFConverter.convert_pptx_to_pdf(output_path, OUTPUT_DIR)
-            if pdf_path:
-                pdf_filename = os.path.basename(pdf_path)
-        
-        return {
-            "success": True,
-            "message": "Presentation generated successfully",
-            "filename": output_filename,
-            "pdf_filename": pdf_filename,
-            "slides_count": len(slides),
-            "template": template,
-            "color_scheme": color_scheme
-        }
+        if pdf_path:
+            pdf_filename = os.path.basename(pdf_path)
+    
+    return output_filename, pdf_filename
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"  # don't let nginx buffer the stream
+}
+
+async def generate_topic_presentation(topic: str, num_slides: int, template: str, color_scheme: str, custom_prompt: Optional[str], use_images: bool, generate_pdf: bool, report: Optional[Callable] = None) -> Dict:
+    """Topic → slides → PPTX/PDF, shared by the request and job endpoints"""
+    report = report or (lambda stage, **info: None)
+    
+    # Enforce maximum of 10 slides
+    num_slides = min(num_slides, 10)
+    
+    backend_template = TEMPLATE_MAPPING.get(template, 'modern')
+    backend_color = COLOR_MAPPING.get(color_scheme, 'blue')
+    
+    print(f"\n🎨 Frontend → Backend Mapping:")
+    print(f"   Template: {template} → {backend_template}")
+    print(f"   Color: {color_scheme} → {backend_color}")
+    print(f"   Slides: {num_slides} (max 10)")
+    print(f"   🖼️  Images: {'ENABLED' if use_images else 'DISABLED'}")
+    print(f"   📄 PDF: {'ENABLED' if generate_pdf else 'DISABLED'}")
+    
+    # Identical requests already in flight share one generation; different
+    # ones arriving together are micro-batched into one decode
+    report("generating", num_slides=num_slides)
+    flight_key = cache_key(
+        topic=normalize_text(topic).casefold(),
+        num_slides=num_slides,
+        custom_prompt=normalize_text(custom_prompt)
+    )
+    slides = await topic_flights.run(
+        flight_key, lambda report: topic_scheduler.submit(topic, num_slides, custom_prompt)
+    )
+    
+    report("rendering", slides_count=len(slides))
+    output_filename, pdf_filename = await cpu_pool.run(
+        build_presentation, slides, topic, f"{topic}.pptx",
+        backend_template, backend_color, use_images, generate_pdf
+    )
+    
+    return {
+        "success": True,
+        "message": "Presentation generated successfully",
+        "filename": output_filename,
+        "pdf_filename": pdf_filename,
+        "slides_count": len(slides),
+        "template": template,
+        "color_scheme": color_scheme,
+        "timings": timings()
+    }
+
+async def build_pdf_deck(upload_path: str, original_filename: str, slides_per_chapter: int, custom_prompt: Optional[str], report: Callable, upload_sha256: Optional[str] = None) -> Dict:
+    """Extract chapters and generate the deck's slides for one saved PDF"""
+    ai_generator = model_registry.get_generator()
+    
+    # Extract chapters
+    report("extracting")
+    chapters = await cpu_pool.run(extract_chapters, upload_path, upload_sha256)
+    
+    num_chapters = len(chapters)
+    slides_per_chapter_adjusted, include_dividers = chapter_slide_budget(num_chapters)
+    
+    print(f"\n{'='*70}")
+    print(f"📚 PDF: {original_filename}")
+    print(f"📖 Chapters: {num_chapters}")
+    print(f"🎯 Requested slides/chapter: {slides_per_chapter}")
+    print(f"✅ Adjusted slides/chapter: {slides_per_chapter_adjusted}")
+    print(f"📊 Max total slides: {MAX_TOTAL_SLIDES}")
+    print(f"{'='*70}\n")
+    
+    # Plan every chapter up front so all prompts can be decoded together
+    plan = plan_pdf_slides(chapters, slides_per_chapter_adjusted, include_dividers, MAX_TOTAL_SLIDES)
+    
+    print(f"🧺 Decoding {len(plan)} chapter(s) in one batched pass")
+    report("generating", chapters_detected=num_chapters)
+    chapter_slides = await inference_pool.run(
+        ai_generator.generate_slides_from_chapters,
+        [entry for entry in plan if entry["num_slides"] > 0],
+        custom_prompt
+    )
+    
+    all_slides = assemble_pdf_slides(plan, iter(chapter_slides), include_dividers, MAX_TOTAL_SLIDES)
+    
+    print(f"\n{'='*70}")
+    print(f"✅ PDF COMPLETE")
+    print(f"   📚 Chapters: {len(chapters)}")
+    print(f"   📄 Total slides: {len(all_slides)}")
+    if len(chapters) > 0:
+        print(f"   📊 Avg/chapter: {len(all_slides) / len(chapters):.1f}")
+    print(f"{'='*70}\n")
+    
+    return {"slides": all_slides, "chapters_detected": num_chapters}
+
+async def generate_pdf_presentation(upload_path: str, original_filename: str, slides_per_chapter: int, template: str, color_scheme: str, custom_prompt: Optional[str], use_images: bool, generate_pdf: bool, report: Optional[Callable] = None, upload_sha256: Optional[str] = None) -> Dict:
+    """Saved PDF → chapters → slides → PPTX/PDF, shared by the request and job endpoints"""
+    report = report or (lambda stage, **info: None)
+    
+    backend_template = TEMPLATE_MAPPING.get(template, 'modern')
+    backend_color = COLOR_MAPPING.get(color_scheme, 'blue')
+    
+    print(f"\n🎨 Frontend → Backend Mapping:")
+    print(f"   Template: {template} → {backend_template}")
+    print(f"   Color: {color_scheme} → {backend_color}")
+    print(f"   🖼️  Images: {'ENABLED' if use_images else 'DISABLED'}")
+    print(f"   📄 PDF: {'ENABLED' if generate_pdf else 'DISABLED'}")
+    
+    # The same file with the same instructions shares one extraction and
+    # generation; template, colors and output format stay per request
+    upload_sha256 = upload_sha256 or await cpu_pool.run(file_sha256, upload_path)
+    flight_key = cache_key(
+        sha256=upload_sha256,
+        slides_per_chapter=slides_per_chapter,
+        custom_prompt=normalize_text(custom_prompt)
+    )
+    # Every job sharing the flight sees its extraction/generation progress
+    deck = await pdf_flights.run(
+        flight_key,
+        lambda flight_report: build_pdf_deck(upload_path, original_filename, slides_per_chapter, custom_prompt, flight_report, upload_sha256),
+        report
+    )
+    all_slides, num_chapters = deck["slides"], deck["chapters_detected"]
+    
+    report("rendering", chapters_detected=num_chapters, total_slides=len(all_slides))
+    output_filename, pdf_filename = await cpu_pool.run(
+        build_presentation, all_slides, os.path.splitext(original_filename)[0], f"{original_filename}.pptx",
+        backend_template, backend_color, use_images, generate_pdf
+    )
+    
+    return {
+        "success": True,
+        "message": "PDF processed successfully",
+        "filename": output_filename,
+        "pdf_filename": pdf_filename,
+        "chapters_detected": num_chapters,
+        "total_slides": len(all_slides),
+        "slides_per_chapter": round(len(all_slides) / num_chapters, 1) if num_chapters > 0 else 0,
+        "template": template,
+        "color_scheme": color_scheme,
+        "timings": timings()
+    }
+
+@router.post("/generate-from-topic", dependencies=[Depends(get_ai_generator)])
+async def generate_from_topic(
+    topic: str = Form(...),
+    num_slides: int = Form(10),
+    template: str = Form("executive"),
+    color_scheme: str = Form("ocean"),
+    custom_prompt: Optional[str] = Form(None),
+    use_images: bool = Form(False),
+    generate_pdf: bool = Form(False)
+):
+    """Generate presentation from topic - MAX 10 SLIDES"""
+    start_trace()
+    try:
+        return await generate_topic_presentation(
+            topic, num_slides, template, color_scheme, custom_prompt, use_images, generate_pdf
+        )
+    except PoolSaturatedError as e:
+        raise busy_error(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/generate-from-pdf")
+@router.post("/generate-from-pdf", dependencies=[Depends(get_ai_generator)])
 async def generate_from_pdf(
     file: UploadFile = File(...),
     slides_per_chapter: int = Form(10),
@@ -116,159 +419,209 @@ async def generate_from_pdf(
     generate_pdf: bool = Form(False)
 ):
     """Generate from PDF - MAX 10 TOTAL SLIDES with proper Topic numbering"""
+    start_trace()
     try:
-        backend_template = TEMPLATE_MAPPING.get(template, 'modern')
-        backend_color = COLOR_MAPPING.get(color_scheme, 'blue')
-        
-        print(f"\n🎨 Frontend → Backend Mapping:")
-        print(f"   Template: {template} → {backend_template}")
-        print(f"   Color: {color_scheme} → {backend_color}")
-        print(f"   🖼️  Images: {'ENABLED' if use_images else 'DISABLED'}")
-        print(f"   📄 PDF: {'ENABLED' if generate_pdf else 'DISABLED'}")
-        
-        upload_filename = generate_unique_filename(file.filename)
-        upload_path = os.path.join(UPLOAD_DIR, upload_filename)
-        
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract chapters
-        pdf_processor = PDFProcessor(upload_path)
-        pages_text = pdf_processor.extract_text_by_pages()
-        chapters = pdf_processor.detect_chapters(pages_text)
-        
-        # ENFORCE MAXIMUM 10 SLIDES TOTAL
-        MAX_TOTAL_SLIDES = 10
-        num_chapters = len(chapters)
-        
-        # If only 1 chapter, use all 10 slides for content
-        if num_chapters == 1:
-            slides_per_chapter_adjusted = MAX_TOTAL_SLIDES
-            include_dividers = False
-        else:
-            # Reserve slides for dividers, distribute rest
-            available_for_content = MAX_TOTAL_SLIDES - num_chapters
-            slides_per_chapter_adjusted = max(1, available_for_content // num_chapters)
-            include_dividers = True
-        
-        print(f"\n{'='*70}")
-        print(f"📚 PDF: {file.filename}")
-        print(f"📖 Chapters: {num_chapters}")
-        print(f"🎯 Requested slides/chapter: {slides_per_chapter}")
-        print(f"✅ Adjusted slides/chapter: {slides_per_chapter_adjusted}")
-        print(f"📊 Max total slides: {MAX_TOTAL_SLIDES}")
-        print(f"{'='*70}\n")
+        upload_path, upload_sha256 = await cpu_pool.run(save_upload, file.file, file.filename)
         
-        ai_generator = AIGenerator()
-        all_slides = []
+        result = await generate_pdf_presentation(
+            upload_path, file.filename, slides_per_chapter, template, color_scheme,
+            custom_prompt, use_images, generate_pdf, upload_sha256=upload_sha256
+        )
         
-        for chapter_idx, chapter in enumerate(chapters, 1):
-            # STOP if we're at limit
-            if len(all_slides) >= MAX_TOTAL_SLIDES:
-                print(f"\n⚠️  Reached slide limit ({MAX_TOTAL_SLIDES}), stopping")
-                break
+        os.remove(upload_path)
+        return result
+    
+    except PoolSaturatedError as e:
+        raise busy_error(e)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate-from-topic/stream")
+async def generate_from_topic_stream(
+    topic: str = Form(...),
+    num_slides: int = Form(10),
+    template: str = Form("executive"),
+    color_scheme: str = Form("ocean"),
+    custom_prompt: Optional[str] = Form(None),
+    use_images: bool = Form(False),
+    generate_pdf: bool = Form(False),
+    ai_generator: AIGenerator = Depends(get_ai_generator)
+):
+    """Stream slides as server-sent events while they are decoded.
+    
+    Emits one `slide` event per finished slide, then `done` with the
+    download filenames (or `error`).
+    """
+    num_slides = min(num_slides, 10)
+    backend_template = TEMPLATE_MAPPING.get(template, 'modern')
+    backend_color = COLOR_MAPPING.get(color_scheme, 'blue')
+    trace = start_trace()
+    
+    def events() -> Iterator[str]:
+        try:
+            slides = []
+            for slide in ai_generator.stream_slides_from_topic(topic, num_slides, custom_prompt):
+                slides.append(slide)
+                yield sse_event("slide", slide)
             
-            print(f"\n{'─'*70}")
-            print(f"📖 CHAPTER {chapter_idx}/{num_chapters}: {chapter['title']}")
-            print(f"{'─'*70}")
+            output_filename, pdf_filename = build_presentation(
+                slides, topic, f"{topic}.pptx",
+                backend_template, backend_color, use_images, generate_pdf
+            )
             
-            # Add chapter divider (only if multiple chapters)
-            if include_dividers:
-                divider_slide = {
-                    "slide_number": len(all_slides) + 1,
-                    "title": f"Chapter {chapter_idx}",
-                    "content": [
-                        chapter['title'],
-                        "Key topics in this chapter"
-                    ],
-                    "visual_note": f"Chapter {chapter_idx}",
-                    "is_chapter_divider": True,
-                    "needs_image": True,
-                    "image_query": chapter['title']
-                }
-                all_slides.append(divider_slide)
-                print(f"   ✅ Chapter {chapter_idx} divider added")
+            yield sse_event("done", {
+                "success": True,
+                "filename": output_filename,
+                "pdf_filename": pdf_filename,
+                "slides_count": len(slides),
+                "template": template,
+                "color_scheme": color_scheme,
+                "timings": trace.summary()
+            })
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+    
+    # Refuse now - once the stream has started only an error event can be sent.
+    # The whole stream then holds one inference slot until it ends
+    try:
+        stream = inference_pool.stream(events())
+    except PoolSaturatedError as e:
+        raise busy_error(e)
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/generate-from-pdf/stream")
+async def generate_from_pdf_stream(
+    file: UploadFile = File(...),
+    slides_per_chapter: int = Form(10),
+    template: str = Form("executive"),
+    color_scheme: str = Form("ocean"),
+    custom_prompt: Optional[str] = Form(None),
+    use_images: bool = Form(False),
+    generate_pdf: bool = Form(False),
+    ai_generator: AIGenerator = Depends(get_ai_generator)
+):
+    """Stream PDF slides as server-sent events.
+    
+    Chapters are decoded one after another (not batched) so the first
+    slide reaches the browser as early as possible. Emits `status`,
+    `slide`, then `done` (or `error`).
+    """
+    backend_template = TEMPLATE_MAPPING.get(template, 'modern')
+    backend_color = COLOR_MAPPING.get(color_scheme, 'blue')
+    trace = start_trace()
+    
+    try:
+        # Cheap early refusal; the slot itself is taken once the upload is saved
+        inference_pool.check_capacity()
+        # Save the upload before returning - the request body is gone once streaming starts
+        upload_path, upload_sha256 = await cpu_pool.run(save_upload, file.file, file.filename)
+    except PoolSaturatedError as e:
+        raise busy_error(e)
+    original_filename = file.filename
+    
+    def events() -> Iterator[str]:
+        try:
+            yield sse_event("status", {"stage": "extracting"})
             
-            # Calculate remaining capacity
-            remaining_capacity = MAX_TOTAL_SLIDES - len(all_slides)
-            if remaining_capacity <= 0:
-                print(f"   ⚠️  No capacity left")
-                continue
+            chapters = extract_chapters(upload_path, upload_sha256)
             
-            slides_to_generate = min(slides_per_chapter_adjusted, remaining_capacity)
+            slides_per_chapter_adjusted, include_dividers = chapter_slide_budget(len(chapters))
+            plan = plan_pdf_slides(chapters, slides_per_chapter_adjusted, include_dividers, MAX_TOTAL_SLIDES)
             
-            # Generate content slides with chapter number and current slide count
-            chapter_slides = ai_generator.generate_slides_from_content(
-                content=chapter["content"],
-                title=chapter["title"],
-                num_slides=slides_to_generate,
-                custom_prompt=custom_prompt,
-                chapter_number=chapter_idx,
-                total_slides_so_far=len(all_slides)
-            )
+            yield sse_event("status", {"stage": "generating", "chapters_detected": len(chapters)})
             
-            # Add all generated slides (already have proper numbering and formatting)
-            added_count = 0
-            for slide in chapter_slides:
-                # STOP if we hit limit
-                if len(all_slides) >= MAX_TOTAL_SLIDES:
-                    print(f"   ⚠️  Hit slide limit")
-                    break
+            all_slides = []
+            for entry in plan:
+                if include_dividers:
+                    all_slides.append(make_divider_slide(entry["chapter_number"], entry["title"]))
+                    all_slides[-1]["slide_number"] = len(all_slides)
+                    yield sse_event("slide", all_slides[-1])
+                
+                if entry["num_slides"] <= 0:
+                    continue
                 
-                all_slides.append(slide)
-                print(f"   ✅ Added: {slide['title']}")
-                added_count += 1
+                for slide in ai_generator.stream_slides_from_content(
+                    content=entry["content"],
+                    title=entry["title"],
+                    num_slides=entry["num_slides"],
+                    custom_prompt=custom_prompt,
+                    chapter_number=entry["chapter_number"],
+                    total_slides_so_far=len(all_slides)
+                ):
+                    if len(all_slides) >= MAX_TOTAL_SLIDES:
+                        break
+                    all_slides.append(slide)
+                    all_slides[-1]["slide_number"] = len(all_slides)
+                    yield sse_event("slide", slide)
             
-            print(f"   📊 Added {added_count} slides | Total: {len(all_slides)}/{MAX_TOTAL_SLIDES}")
-        
-        print(f"\n{'='*70}")
-        print(f"✅ PDF COMPLETE")
-        print(f"   📚 Chapters: {len(chapters)}")
-        print(f"   📄 Total slides: {len(all_slides)}")
-        if len(chapters) > 0:
-            print(f"   📊 Avg/chapter: {len(all_slides) / len(chapters):.1f}")
-        print(f"{'='*70}\n")
-        
-        # Generate PowerPoint
-        pptx_generator = PPTXGenerator(
-            template=backend_template, 
-            color_scheme=backend_color,
-            use_images=use_images
-        )
-        output_filename = generate_unique_filename(f"{file.filename}.pptx")
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        
-        pptx_generator.generate_presentation(
-            slides_data=all_slides,
-            presentation_title=os.path.splitext(file.filename)[0],
-            output_path=output_path
-        )
-        
-        # Generate PDF if requested
-        pdf_filename = None
-        if generate_pdf:
-            pdf_path = PDFConverter.convert_pptx_to_pdf(output_path, OUTPUT_DIR)
-            if pdf_path:
-                pdf_filename = os.path.basename(pdf_path)
-        
+            output_filename, pdf_filename = build_presentation(
+                all_slides, os.path.splitext(original_filename)[0], f"{original_filename}.pptx",
+                backend_template, backend_color, use_images, generate_pdf
+            )
+            
+            yield sse_event("done", {
+                "success": True,
+                "filename": output_filename,
+                "pdf_filename": pdf_filename,
+                "chapters_detected": len(chapters),
+                "total_slides": len(all_slides),
+                "template": template,
+                "color_scheme": color_scheme,
+                "timings": trace.summary()
+            })
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+    
+    try:
+        stream = inference_pool.stream(events())
+    except PoolSaturatedError as e:
         os.remove(upload_path)
-        
-        return {
-            "success": True,
-            "message": "PDF processed successfully",
-            "filename": output_filename,
-            "pdf_filename": pdf_filename,
-            "chapters_detected": len(chapters),
-            "total_slides": len(all_slides),
-            "slides_per_chapter": round(len(all_slides) / len(chapters), 1) if len(chapters) > 0 else 0,
-            "template": template,
-            "color_scheme": color_scheme
+        raise busy_error(e)
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/health")
+async def health():
+    """Liveness - answers as soon as the process is up"""
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness():
+    """Readiness - 200 only once the shared model is loaded and warm"""
+    status = model_registry.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status, headers={"Retry-After": "10"})
+    return status
+
+@router.get("/metrics")
+async def metrics():
+    """Runtime counters for tuning batching and throughput"""
+    generator = model_registry.generator
+    return {
+        "model": model_registry.status(),
+        "topic_batching": topic_scheduler.stats(),
+        "inference": generator.backend.stats() if generator else None,
+        "slide_cache": slide_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "worker_pools": {
+            "inference": inference_pool.stats(),
+            "cpu": cpu_pool.stats(),
+            "process": process_pool_stats()
+        },
+        "jobs": await asyncio.to_thread(job_runner.stats),
+        "coalescing": {
+            "topic": topic_flights.stats(),
+            "pdf": pdf_flights.stats()
         }
-    
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+    }
 
 @router.get("/download/{filename}")
 async def download_presentation(filename: str):
@@ -1,11 +1,39 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.api.jobs import router as jobs_router
+from app.services.model_registry import model_registry
+from app.services.batch_scheduler import topic_scheduler
+from app.services.worker_pool import inference_pool, cpu_pool, shutdown_process_pool
+from app.services.job_runner import job_runner
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model in the background so health checks answer during warm-up;
+    # generation routes return 503 until the registry reports ready
+    topic_scheduler.start()
+    # Jobs left over from a previous run wait for the model, then resume
+    await job_runner.start()
+    stop_loading = threading.Event()
+    loader = asyncio.create_task(asyncio.to_thread(model_registry.keep_loading, stop_loading))
+    yield
+    if not loader.done():
+        print("⚠️  Shutting down while model is still loading")
+        stop_loading.set()
+    await job_runner.stop()
+    await topic_scheduler.stop()
+    inference_pool.shutdown()
+    cpu_pool.shutdown()
+    shutdown_process_pool()
 
 app = FastAPI(
     title="EduSlide AI Backend",
     description="AI-powered presentation generation API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend
@@ -18,6 +46,7 @@ app.add_middleware(
 )
 
 app.include_router(router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
 
 @app.get("/")
 def read_root():
@@ -27,6 +56,9 @@ def read_root():
         "endpoints": {
             "generate_from_topic": "/api/generate-from-topic",
             "generate_from_pdf": "/api/generate-from-pdf",
-            "download": "/api/download/{filename}"
-        }
+            "download": "/api/download/{filename}",
+            "jobs": "/api/jobs",
+            "ready": "/api/health/ready"
+        },
+        "model": model_registry.state
     }
\ No newline at end of file
@@ -1,59 +1,49 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterator
 import re
+from app.services.inference_backend import InferenceBackend, create_backend
+from app.services.slide_parser import SLIDE_HEADER, SlideStreamParser, JsonSlideStreamParser, parse_slide_block, parse_slides_json, is_well_formed
+from app.services.slide_cache import SlideCache, slide_cache, cache_key, normalize_text
+from app.services.chunking import split_into_chunks, truncate_to_tokens
+from app.services.instrumentation import stage
 
-class AIGenerator:
-    def __init__(self):
-        print("🔄 Loading Qwen 2.5 3B model (better quality, no login needed)...")
-        
-        # BEST MODEL - No authentication required, excellent quality
-        model_name = "Qwen/Qwen2.5-3B-Instruct"
-        
-        try:
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model_name,
-                trust_remote_code=True
-            )
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16,
-                device_map="cpu",
-                trust_remote_code=True,
-                low_cpu_mem_usage=True
-            )
-            print("✅ Qwen 2.5 3B model ready!")
-            
-        except Exception as e:
-            print(f"⚠️  Qwen failed: {e}")
-            print("🔄 Falling back to TinyLlama...")
-            
-            # Ultimate fallback - TinyLlama (always works)
-            model_name = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16,
-                device_map="cpu"
-            )
-            print("✅ TinyLlama model ready (fallback)")
-    
-    def generate_slides_from_topic(self, topic: str, num_slides: int = 10, custom_prompt: Optional[str] = None) -> List[Dict]:
-        """Generate slides using AI"""
-        
-        print(f"\n{'='*60}")
-        print(f"🚀 Generating: {topic} ({num_slides} slides)")
-        if custom_prompt:
-            print(f"📝 Custom Instructions: {custom_prompt}")
-        print(f"{'='*60}\n")
-        
-        prompt = f"""Create {num_slides} educational slides about {topic}.
+# Max chapter prompts decoded together for one PDF
+CHAPTER_BATCH_SIZE = int(os.getenv("CHAPTER_BATCH_SIZE", "8"))
+
+# Greedy decoding: the same request always yields the same slides, which
+# also makes every slide cache hit identical to a fresh generation
+DETERMINISTIC = os.getenv("DETERMINISTIC_GENERATION", "0") == "1"
+TOPIC_TEMPERATURE = 0.0 if DETERMINISTIC else 0.7
+CHAPTER_TEMPERATURE = 0.0 if DETERMINISTIC else 0.6
 
-Format EXACTLY like this:
+# Sampled slides differ from run to run; caching them would pin one draw,
+# good or bad, for every identical request. They are only cached with
+# greedy decoding, unless SLIDE_CACHE_SAMPLED=1 opts in
+CACHE_SLIDES = DETERMINISTIC or os.getenv("SLIDE_CACHE_SAMPLED", "0") == "1"
+
+# Constrain decoding to the JSON slide schema instead of parsing free text
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "0") == "1"
+
+# Chapter text per slide prompt, in tokens. Longer chapters are split into
+# chunks that are summarized in batches (map), and the joined summaries are
+# summarized again until they fit (reduce)
+CHAPTER_CONTENT_TOKENS = int(os.getenv("CHAPTER_CONTENT_TOKENS", "1024"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1024"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "192"))
+SUMMARY_MIN_TOKENS = 48
+SUMMARY_MAX_ROUNDS = 3
+
+# Before any of that, chapters over budget keep only their most central
+# sentences (TextRank): this share of their tokens, but never less than the
+# budget. Chapters that already fit are left alone. 1 disables the pass
+EXTRACTIVE_RATIO = float(os.getenv("EXTRACTIVE_RATIO", "0.6"))
+
+# Static leading part of each user prompt - kept free of per-request values
+# so the KV for system message + instructions can be cached
+TOPIC_FORMAT = """Format EXACTLY like this:
 
 Slide 1
-Title: Introduction to {topic}
+Title: Introduction to the Topic
 - First key point about the topic
 - Second important detail
 - Third relevant fact
@@ -64,71 +54,242 @@ Title: Main Concept 1
 - Example or detail
 - Additional information
 
-Create {num_slides} slides with clear titles and 3-4 bullet points each."""
+"""
+
+CHAPTER_FORMAT = """Extract REAL information from the text into slides.
+
+Format:
+
+Slide 1
+Title: First Key Topic
+- First point from content
+- Second point from content  
+- Third point from content
+
+Slide 2
+Title: Second Key Topic
+- Main concept
+- Supporting detail
+- Additional fact
+
+"""
+
+TOPIC_JSON_FORMAT = """Respond with JSON only, EXACTLY in this shape:
+
+{"slides": [
+  {"title": "Introduction to the Topic", "content": ["First key point about the topic", "Second important detail", "Third relevant fact"]},
+  {"title": "Main Concept 1", "content": ["Explanation of concept", "Example or detail", "Additional information"]}
+]}
+
+"""
+
+SUMMARY_FORMAT = """Summarize the passage below as compact study notes.
+Keep definitions, key facts, names, numbers and examples; drop filler and repetition.
+Write plain sentences - no headings, no slides, no preamble.
+
+"""
+
+CHAPTER_JSON_FORMAT = """Extract REAL information from the text into slides.
+
+Respond with JSON only, in this shape:
+
+{"slides": [
+  {"title": "First Key Topic", "content": ["First point from content", "Second point from content", "Third point from content"]},
+  {"title": "Second Key Topic", "content": ["Main concept", "Supporting detail", "Additional fact"]}
+]}
+
+"""
+
+class AIGenerator:
+    def __init__(self, backend: Optional[InferenceBackend] = None, cache: Optional[SlideCache] = None):
+        # In-process transformers by default, or an OpenAI-compatible server
+        self.backend = backend or create_backend()
+        self.model_name = self.backend.model_name
+        self.runtime = self.backend.runtime
+        self.cache = cache or slide_cache
+        self.structured = STRUCTURED_OUTPUT
+    
+    def warmup(self):
+        """Let the backend prepare so the first real request doesn't pay for lazy init"""
+        self.backend.warmup([
+            self._build_topic_prompt("warm-up", 1, structured=self.structured),
+            self._build_chapter_prompt("", "warm-up", 1, structured=self.structured),
+            self._build_summary_prompt("", "warm-up")
+        ], structured=self.structured)
+    
+    def _build_topic_prompt(self, topic: str, num_slides: int, custom_prompt: Optional[str] = None, structured: bool = False) -> Dict:
+        """Prompt for topic generation (static format first, request details last)"""
+        prompt = f"""Create {num_slides} educational slides about {topic}.
+
+Use clear titles and 3-4 bullet points per slide."""
 
         if custom_prompt:
             prompt += f"\n\nADDITIONAL INSTRUCTIONS:\n{custom_prompt}"
         
         prompt += f"\n\nCreate {num_slides} slides now:"
-
+        
+        return {
+            "system": "You are an expert educator. Create well-structured slides.",
+            "static": TOPIC_JSON_FORMAT if structured else TOPIC_FORMAT,
+            "variable": prompt
+        }
+    
+    def _cache_key(self, prompt: Dict, num_slides: int, custom_prompt: Optional[str], temperature: float, **extra) -> str:
+        """Key over everything that changes the parsed slides"""
+        return cache_key(
+            model=self.model_name,
+            runtime=self.runtime,
+            prompt=normalize_text(prompt["system"] + "\n" + prompt["static"] + prompt["variable"]),
+            num_slides=num_slides,
+            custom_prompt=normalize_text(custom_prompt),
+            temperature=temperature,
+            **extra
+        )
+    
+    def _chapter_cache_key(self, prompt: Dict, num_slides: int, custom_prompt: Optional[str], chapter_number: int, total_slides_so_far: int) -> str:
+        """Chapter slides also carry their chapter and deck position"""
+        return self._cache_key(
+            prompt, num_slides, custom_prompt, CHAPTER_TEMPERATURE,
+            chapter_number=chapter_number, total_slides_so_far=total_slides_so_far
+        )
+    
+    def _cached_slides(self, key: str) -> Optional[List[Dict]]:
+        return self.cache.get(key) if CACHE_SLIDES else None
+    
+    def _cache_slides(self, key: str, slides: List[Dict], complete: bool):
+        """Cache slides only if the model produced all of them, well-formed.
+        
+        Padded or fallback decks stay uncached so the next request (or a
+        regenerate) gets a fresh attempt.
+        """
+        if complete and CACHE_SLIDES:
+            self.cache.put(key, slides)
+    
+    def generate_slides_from_topic(self, topic: str, num_slides: int = 10, custom_prompt: Optional[str] = None) -> List[Dict]:
+        """Generate slides using AI"""
+        
+        print(f"\n{'='*60}")
+        print(f"🚀 Generating: {topic} ({num_slides} slides)")
+        if custom_prompt:
+            print(f"📝 Custom Instructions: {custom_prompt}")
+        print(f"{'='*60}\n")
+        
+        slides_per_request, _ = self.generate_slides_from_topics_batch([{
+            "topic": topic,
+            "num_slides": num_slides,
+            "custom_prompt": custom_prompt
+        }])
+        return slides_per_request[0]
+    
+    def generate_slides_from_topics_batch(self, requests: List[Dict]) -> Tuple[List[List[Dict]], int]:
+        """Generate slides for several topics in one batched decode.
+        
+        Each request is a dict with topic, num_slides and custom_prompt.
+        Returns one slide list per request (same order) plus the number of
+        tokens generated for the whole batch.
+        """
+        prompts = [
+            self._build_topic_prompt(r["topic"], r["num_slides"], r.get("custom_prompt"), self.structured)
+            for r in requests
+        ]
+        keys = [
+            self._cache_key(prompt, r["num_slides"], r.get("custom_prompt"), TOPIC_TEMPERATURE)
+            for prompt, r in zip(prompts, requests)
+        ]
+        results = [self._cached_slides(key) for key in keys]
+        misses = [i for i, slides in enumerate(results) if slides is None]
+        
+        if len(misses) < len(requests):
+            print(f"💾 Slide cache: {len(requests) - len(misses)}/{len(requests)} request(s) served from cache")
+        if not misses:
+            return results, 0
+        
         try:
-            messages = [
-                {"role": "system", "content": "You are an expert educator. Create well-structured slides."},
-                {"role": "user", "content": prompt}
-            ]
+            print(f"🔄 Generating content... (batch of {len(misses)})")
             
-            text = self.tokenizer.apply_chat_template(
-                messages,
-                tokenize=False,
-                add_generation_prompt=True
+            responses, generated = self.backend.generate(
+                [prompts[i] for i in misses], temperature=TOPIC_TEMPERATURE,
+                slide_targets=[requests[i]["num_slides"] for i in misses], structured=self.structured
             )
-            inputs = self.tokenizer(text, return_tensors="pt")
-            
-            print("🔄 Generating content...")
-            
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_new_tokens=2000,
-                    temperature=0.7,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
-            
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            # Extract response
-            if "assistant" in response.lower():
-                parts = response.split("assistant", 1)
-                if len(parts) > 1:
-                    response = parts[1].strip()
             
-            print(f"\n📥 Generated (first 400 chars):")
-            print(response[:400])
-            print()
+            for i, response in zip(misses, responses):
+                request = requests[i]
+                print(f"\n📥 Generated for '{request['topic']}' (first 400 chars):")
+                print(response[:400])
+                print()
+                
+                with stage("parse"):
+                    parsed = self._parse_topic_slides(response, request["topic"], request["num_slides"])
+                slides = self._pad_topic_slides(parsed, request["topic"], request["num_slides"])
+                print(f"✅ Created {len(slides)} slides ({len(slides) - len(parsed)} placeholder)!")
+                self._cache_slides(keys[i], slides, complete=len(parsed) >= request["num_slides"])
+                results[i] = slides
             
-            slides = self._parse_response(response, topic, num_slides)
-            print(f"✅ Created {len(slides)} slides!")
-            
-            return slides
+            return results, generated
             
         except Exception as e:
             print(f"❌ Error: {e}")
-            return self._create_fallback_slides(topic, num_slides)
+            return [
+                slides if slides is not None else self._create_fallback_slides(r["topic"], r["num_slides"])
+                for r, slides in zip(requests, results)
+            ], 0
     
-    def generate_slides_from_content(self, content: str, title: str, num_slides: int = 10, custom_prompt: Optional[str] = None, chapter_number: int = 1, total_slides_so_far: int = 0) -> List[Dict]:
-        """Generate slides from PDF using AI"""
+    def stream_slides_from_topic(self, topic: str, num_slides: int = 10, custom_prompt: Optional[str] = None) -> Iterator[Dict]:
+        """Yield topic slides one by one as soon as each block is decoded"""
         
         print(f"\n{'='*60}")
-        print(f"🚀 Chapter: {title}")
-        print(f"📄 Length: {len(content)} chars")
+        print(f"📡 Streaming: {topic} ({num_slides} slides)")
+        print(f"{'='*60}\n")
         
-        max_chars = 4000
-        if len(content) > max_chars:
-            print(f"✂️  Truncating: {len(content)} → {max_chars}")
-            content = content[:max_chars]
+        prompt = self._build_topic_prompt(topic, num_slides, custom_prompt, self.structured)
+        key = self._cache_key(prompt, num_slides, custom_prompt, TOPIC_TEMPERATURE)
+        cached = self._cached_slides(key)
+        if cached is not None:
+            print("💾 Slide cache hit")
+            yield from cached
+            return
         
-        print(f"{'='*60}\n")
+        parser = JsonSlideStreamParser() if self.structured else SlideStreamParser()
+        slides = []
+        
+        try:
+            for chunk in self.backend.stream(prompt, temperature=TOPIC_TEMPERATURE, num_slides=num_slides, structured=self.structured):
+                for raw_title, content_lines in parser.feed(chunk):
+                    slides.append(self._topic_slide(len(slides) + 1, raw_title, content_lines, topic))
+                    yield slides[-1]
+                    if len(slides) >= num_slides:
+                        break
+                if len(slides) >= num_slides:
+                    break
+            else:
+                for raw_title, content_lines in parser.finish():
+                    if len(slides) >= num_slides:
+                        break
+                    slides.append(self._topic_slide(len(slides) + 1, raw_title, content_lines, topic))
+                    yield slides[-1]
+                
+                if not slides:
+                    # Model ignored the streaming format - use the full parser
+                    for slide in self._parse_topic_slides(parser.text, topic, num_slides):
+                        slides.append(slide)
+                        yield slide
+            
+            complete = len(slides) >= num_slides and all(is_well_formed(slide["content"]) for slide in slides)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            complete = False
+        
+        while len(slides) < num_slides:
+            slides.append(self._topic_filler_slide(len(slides) + 1, topic))
+            yield slides[-1]
+        
+        # Same key as the batched path, so either one warms the other
+        self._cache_slides(key, slides, complete)
+    
+    def generate_slides_from_content(self, content: str, title: str, num_slides: int = 10, custom_prompt: Optional[str] = None, chapter_number: int = 1, total_slides_so_far: int = 0) -> List[Dict]:
+        """Generate slides from PDF using AI"""
+        
+        content = self._prepare_chapter_content(content, title)
         
         slides = self._extract_with_ai(
             content, title, num_slides, chapter_number, total_slides_so_far, custom_prompt
@@ -137,200 +298,390 @@ Create {num_slides} slides with clear titles and 3-4 bullet points each."""
         print(f"✅ {len(slides)} slides!\n")
         return slides
     
-    def _extract_with_ai(self, content: str, chapter_title: str, num_slides: int, chapter_number: int, total_slides_so_far: int, custom_prompt: Optional[str] = None) -> List[Dict]:
-        """Extract key points using AI"""
+    def generate_slides_from_chapters(self, chapters: List[Dict], custom_prompt: Optional[str] = None) -> List[List[Dict]]:
+        """Generate slides for every chapter with batched decodes.
         
-        print(f"🤖 AI extracting key information...")
+        Each chapter is a dict with content, title, num_slides and
+        chapter_number. Returns one slide list per chapter, numbered from 1
+        within the chapter - the caller renumbers once the deck is assembled.
+        """
+        contents = self._prepare_chapter_contents([(chapter["content"], chapter["title"]) for chapter in chapters])
+        items = [
+            {
+                "content": content,
+                "chapter_title": chapter["title"],
+                "num_slides": chapter["num_slides"],
+                "chapter_number": chapter["chapter_number"],
+                "total_slides_so_far": 0
+            }
+            for chapter, content in zip(chapters, contents)
+        ]
+        
+        results = []
+        for start in range(0, len(items), CHAPTER_BATCH_SIZE):
+            results.extend(self._extract_with_ai_batch(items[start:start + CHAPTER_BATCH_SIZE], custom_prompt))
+        
+        print(f"✅ {sum(len(slides) for slides in results)} slides from {len(items)} chapters!\n")
+        return results
+    
+    def stream_slides_from_content(self, content: str, title: str, num_slides: int = 10, custom_prompt: Optional[str] = None, chapter_number: int = 1, total_slides_so_far: int = 0) -> Iterator[Dict]:
+        """Yield chapter slides one by one as soon as each block is decoded"""
         
+        content = self._prepare_chapter_content(content, title)
+        prompt = self._build_chapter_prompt(content, title, num_slides, custom_prompt, self.structured)
+        key = self._chapter_cache_key(prompt, num_slides, custom_prompt, chapter_number, total_slides_so_far)
+        cached = self._cached_slides(key)
+        if cached is not None:
+            print("💾 Slide cache hit")
+            yield from cached
+            return
+        
+        parser = JsonSlideStreamParser() if self.structured else SlideStreamParser()
+        slides = []
+        
+        try:
+            for chunk in self.backend.stream(prompt, temperature=CHAPTER_TEMPERATURE, num_slides=num_slides, structured=self.structured):
+                for raw_title, content_lines in parser.feed(chunk):
+                    slides.append(self._pdf_slide(len(slides) + 1, raw_title, content_lines, title, chapter_number, total_slides_so_far))
+                    yield slides[-1]
+                    if len(slides) >= num_slides:
+                        break
+                if len(slides) >= num_slides:
+                    break
+            else:
+                remaining = parser.finish()
+                if not slides and not remaining:
+                    # Model ignored the streaming format - use the full parser
+                    for slide in self._parse_response_for_pdf(parser.text, title, num_slides, chapter_number, total_slides_so_far):
+                        slides.append(slide)
+                        yield slide
+                
+                for raw_title, content_lines in remaining:
+                    if len(slides) >= num_slides:
+                        break
+                    slides.append(self._pdf_slide(len(slides) + 1, raw_title, content_lines, title, chapter_number, total_slides_so_far))
+                    yield slides[-1]
+            
+            complete = len(slides) >= num_slides and all(is_well_formed(slide["content"]) for slide in slides)
+        except Exception as e:
+            print(f"❌ AI failed: {e}")
+            if not slides:
+                yield from self._extract_slides_from_content_direct(content, title, num_slides, chapter_number, total_slides_so_far)
+                return
+            complete = False
+        
+        emitted = len(slides)
+        slides = self._ensure_minimum_slides(slides, content, title, num_slides, chapter_number, total_slides_so_far)
+        yield from slides[emitted:]
+        
+        self._cache_slides(key, slides, complete)
+    
+    def _prepare_chapter_content(self, content: str, title: str) -> str:
+        """Fit one chapter's text into the slide prompt"""
+        return self._prepare_chapter_contents([(content, title)])[0]
+    
+    def _content_budget(self) -> Tuple[int, int]:
+        """(tokens of chapter text per prompt, tokens per summary chunk)"""
+        # Leave at least half the context for instructions and the completion
+        limit = max(256, self.backend.context_window // 2)
+        return min(CHAPTER_CONTENT_TOKENS, limit), min(SUMMARY_CHUNK_TOKENS, limit)
+    
+    def _prepare_chapter_contents(self, chapters: List[Tuple[str, str]]) -> List[str]:
+        """Fit every (content, title) into the slide prompt budget.
+        
+        Chapters over budget drop redundant and peripheral sentences first
+        (extractive, no model call). Those still over are map-reduced: split
+        into token-bounded chunks, the chunks of all chapters summarized in
+        shared batches, and the joined summaries summarized again while
+        still too long. Whatever doesn't converge is cut to its leading part.
+        """
+        budget, chunk_tokens = self._content_budget()
+        contents = []
+        pending = []
+        
+        for i, (content, title) in enumerate(chapters):
+            tokens = self.backend.count_tokens(content) if content else 0
+            print(f"\n{'='*60}")
+            print(f"🚀 Chapter: {title}")
+            print(f"📄 Length: {len(content)} chars, {tokens} tokens (budget {budget})")
+            
+            if EXTRACTIVE_RATIO < 1 and tokens > budget:
+                target = max(budget, int(tokens * EXTRACTIVE_RATIO))
+                # NumPy loads with the first long chapter, not at server start
+                from app.services.extractive import extractive_summary
+                with stage("extractive", input_tokens=tokens) as counts:
+                    content = extractive_summary(content, self.backend.count_tokens, target)
+                    condensed = counts["output_tokens"] = self.backend.count_tokens(content)
+                print(f"🧮 Extractive: {tokens} → {condensed} tokens")
+                tokens = condensed
+            print(f"{'='*60}\n")
+            contents.append(content)
+            if tokens > budget:
+                pending.append(i)
+        
+        for round_number in range(1, SUMMARY_MAX_ROUNDS + 1):
+            if not pending:
+                break
+            
+            # Summary length per chunk so that a chapter's joined summaries fit
+            jobs = []
+            for i in pending:
+                chunks = split_into_chunks(contents[i], self.backend.count_tokens, chunk_tokens)
+                max_new_tokens = min(SUMMARY_MAX_TOKENS, max(SUMMARY_MIN_TOKENS, budget // len(chunks)))
+                jobs.extend((i, chunk, max_new_tokens) for chunk in chunks)
+            
+            print(f"🗜️  Summarizing {len(jobs)} chunk(s) of {len(pending)} chapter(s) (round {round_number})")
+            with stage("summarize", chunks=len(jobs)):
+                summaries = self._summarize_chunks([(chapters[i][1], chunk, limit) for i, chunk, limit in jobs])
+            if summaries is None:
+                break
+            
+            for i in pending:
+                contents[i] = "\n\n".join(summary for (j, _, _), summary in zip(jobs, summaries) if j == i)
+            pending = [i for i in pending if self.backend.count_tokens(contents[i]) > budget]
+        
+        for i in pending:
+            print(f"✂️  Truncating '{chapters[i][1]}' to {budget} tokens")
+            contents[i] = truncate_to_tokens(contents[i], self.backend.count_tokens, budget)
+        
+        return contents
+    
+    def _summarize_chunks(self, jobs: List[Tuple[str, str, int]]) -> Optional[List[str]]:
+        """Summaries of (chapter title, chunk, max tokens) jobs, or None if the model failed.
+        
+        Jobs with the same length limit are decoded together in batches;
+        summaries are cached like slides, so a re-uploaded PDF skips this.
+        """
+        summaries: List[Optional[str]] = [None] * len(jobs)
+        prompts = [self._build_summary_prompt(chunk, title) for title, chunk, _ in jobs]
+        keys = [
+            cache_key(kind="summary", model=self.model_name, runtime=self.runtime, prompt=prompt["variable"], max_new_tokens=limit)
+            for prompt, (_, _, limit) in zip(prompts, jobs)
+        ]
+        
+        by_limit: Dict[int, List[int]] = {}
+        for i, key in enumerate(keys):
+            summaries[i] = self.cache.get(key)
+            if summaries[i] is None:
+                by_limit.setdefault(jobs[i][2], []).append(i)
+        
+        try:
+            for limit, indices in by_limit.items():
+                for start in range(0, len(indices), CHAPTER_BATCH_SIZE):
+                    batch = indices[start:start + CHAPTER_BATCH_SIZE]
+                    responses, _ = self.backend.generate([prompts[i] for i in batch], temperature=0.0, max_new_tokens=limit)
+                    for i, response in zip(batch, responses):
+                        # An empty summary would drop the chunk entirely
+                        summaries[i] = response or truncate_to_tokens(jobs[i][1], self.backend.count_tokens, limit)
+                        self.cache.put(keys[i], summaries[i])
+        except Exception as e:
+            print(f"❌ Summarization failed: {e}")
+            return None
+        
+        return summaries
+    
+    def _build_summary_prompt(self, chunk: str, chapter_title: str) -> Dict:
+        """Prompt for the map step over one chunk of a long chapter"""
+        return {
+            "system": "You condense textbook passages into faithful notes.",
+            "static": SUMMARY_FORMAT,
+            "variable": f"""Chapter: "{chapter_title}"
+
+PASSAGE:
+{chunk}
+
+Notes:"""
+        }
+    
+    def _build_chapter_prompt(self, content: str, chapter_title: str, num_slides: int, custom_prompt: Optional[str] = None, structured: bool = False) -> Dict:
+        """Prompt for extracting slides from a chapter (static format first)"""
         prompt = f"""Extract {num_slides} key topics from this chapter: "{chapter_title}"
 
 CONTENT:
 {content}
 
-Create {num_slides} slides. Extract REAL information from the text.
-
-Format:
-
-Slide 1
-Title: First Key Topic
-- First point from content
-- Second point from content  
-- Third point from content
-
-Slide 2
-Title: Second Key Topic
-- Main concept
-- Supporting detail
-- Additional fact
-
 Create {num_slides} slides:"""
 
         if custom_prompt:
             prompt += f"\n\nINSTRUCTIONS: {custom_prompt}"
-
+        
+        return {
+            "system": "You extract key information from texts into clear slides.",
+            "static": CHAPTER_JSON_FORMAT if structured else CHAPTER_FORMAT,
+            "variable": prompt
+        }
+    
+    def _extract_with_ai(self, content: str, chapter_title: str, num_slides: int, chapter_number: int, total_slides_so_far: int, custom_prompt: Optional[str] = None) -> List[Dict]:
+        """Extract key points using AI"""
+        return self._extract_with_ai_batch([{
+            "content": content,
+            "chapter_title": chapter_title,
+            "num_slides": num_slides,
+            "chapter_number": chapter_number,
+            "total_slides_so_far": total_slides_so_far
+        }], custom_prompt)[0]
+    
+    def _extract_with_ai_batch(self, items: List[Dict], custom_prompt: Optional[str] = None) -> List[List[Dict]]:
+        """Extract key points for several chapters in one generate call"""
+        
+        prompts = [
+            self._build_chapter_prompt(item["content"], item["chapter_title"], item["num_slides"], custom_prompt, self.structured)
+            for item in items
+        ]
+        keys = [
+            self._chapter_cache_key(prompt, item["num_slides"], custom_prompt, item["chapter_number"], item["total_slides_so_far"])
+            for prompt, item in zip(prompts, items)
+        ]
+        results = [self._cached_slides(key) for key in keys]
+        misses = [i for i, slides in enumerate(results) if slides is None]
+        
+        if len(misses) < len(items):
+            print(f"💾 Slide cache: {len(items) - len(misses)}/{len(items)} chapter(s) served from cache")
+        if not misses:
+            return results
+        
+        print(f"🤖 AI extracting key information... ({len(misses)} chapter(s))")
+        
         try:
-            messages = [
-                {"role": "system", "content": "You extract key information from texts into clear slides."},
-                {"role": "user", "content": prompt}
-            ]
+            print("🔄 AI processing...")
             
-            text = self.tokenizer.apply_chat_template(
-                messages,
-                tokenize=False,
-                add_generation_prompt=True
+            responses, _ = self.backend.generate(
+                [prompts[i] for i in misses], temperature=CHAPTER_TEMPERATURE,
+                slide_targets=[items[i]["num_slides"] for i in misses], structured=self.structured
             )
-            inputs = self.tokenizer(text, return_tensors="pt")
             
-            print("🔄 AI processing...")
-            
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_new_tokens=2000,
-                    temperature=0.6,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id
+        except Exception as e:
+            print(f"❌ AI failed: {e}")
+            for i in misses:
+                item = items[i]
+                results[i] = self._extract_slides_from_content_direct(
+                    item["content"], item["chapter_title"], item["num_slides"],
+                    item["chapter_number"], item["total_slides_so_far"]
                 )
-            
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            
-            if "assistant" in response.lower():
-                parts = response.split("assistant", 1)
-                if len(parts) > 1:
-                    response = parts[1].strip()
-            
-            print(f"\n📥 AI response (first 400 chars):")
+            return results
+        
+        for i, response in zip(misses, responses):
+            item = items[i]
+            print(f"\n📥 AI response for '{item['chapter_title']}' (first 400 chars):")
             print(response[:400])
             print()
             
-            slides = self._parse_response_for_pdf(
-                response, chapter_title, num_slides, chapter_number, total_slides_so_far
-            )
+            with stage("parse"):
+                slides = self._parse_response_for_pdf(
+                    response, item["chapter_title"], item["num_slides"],
+                    item["chapter_number"], item["total_slides_so_far"]
+                )
             
-            if len(slides) < num_slides:
+            complete = len(slides) >= item["num_slides"]
+            if not complete:
                 slides = self._ensure_minimum_slides(
-                    slides, content, chapter_title, num_slides, chapter_number, total_slides_so_far
+                    slides, item["content"], item["chapter_title"], item["num_slides"],
+                    item["chapter_number"], item["total_slides_so_far"]
                 )
             
-            return slides
-            
-        except Exception as e:
-            print(f"❌ AI failed: {e}")
-            return self._extract_slides_from_content_direct(
-                content, chapter_title, num_slides, chapter_number, total_slides_so_far
-            )
+            self._cache_slides(keys[i], slides, complete)
+            results[i] = slides
+        
+        return results
     
-    def _parse_response(self, text: str, topic: str, num_slides: int) -> List[Dict]:
-        """Parse AI response"""
-        slides = []
-        blocks = re.split(r'Slide\s+(\d+)', text, flags=re.IGNORECASE)
+    def _topic_slide(self, slide_num: int, raw_title: Optional[str], content_lines: List[str], topic: str) -> Dict:
+        """Build a topic slide dict from a parsed block"""
+        title = raw_title or f"Topic {slide_num}"
+        if len(title) > 70:
+            title = title[:67] + "..."
+        
+        return {
+            "slide_number": slide_num,
+            "title": title,
+            "content": content_lines[:5],
+            "visual_note": topic,
+            "needs_image": False,
+            "image_query": title
+        }
+    
+    def _pdf_slide(self, topic_num: int, raw_title: Optional[str], content_lines: List[str], chapter_title: str, chapter_number: int, total_slides_so_far: int) -> Dict:
+        """Build a chapter slide dict from a parsed block"""
+        if raw_title:
+            if len(raw_title) > 50:
+                raw_title = raw_title[:47] + "..."
+            title = f"Topic {chapter_number}.{topic_num}: {raw_title}"
+        else:
+            title = f"Topic {chapter_number}.{topic_num}"
+        
+        return {
+            "slide_number": total_slides_so_far + topic_num,
+            "title": title,
+            "content": content_lines[:5],
+            "visual_note": chapter_title,
+            "needs_image": False,
+            "image_query": chapter_title,
+            "chapter": chapter_number
+        }
+    
+    def _split_blocks(self, text: str) -> List[str]:
+        """Split a full response into slide blocks"""
+        blocks = SLIDE_HEADER.split(text)
         
         if len(blocks) <= 2:
             blocks = re.split(r'^(\d+)\.', text, flags=re.MULTILINE)
         
-        slide_num = 1
+        return [block for block in blocks if block.strip() and not block.strip().isdigit()]
+    
+    def _slide_candidates(self, text: str, structured: Optional[bool] = None) -> List[Tuple[Optional[str], List[str]]]:
+        """(title, content lines) for every slide in a response, well-formed or not"""
+        structured = self.structured if structured is None else structured
+        if structured:
+            return parse_slides_json(text)
+        return [parse_slide_block(block) for block in self._split_blocks(text)]
+    
+    def _parse_response(self, text: str, topic: str, num_slides: int) -> List[Dict]:
+        """Parse AI response"""
+        return self._pad_topic_slides(self._parse_topic_slides(text, topic, num_slides), topic, num_slides)
+    
+    def _parse_topic_slides(self, text: str, topic: str, num_slides: int) -> List[Dict]:
+        """Well-formed slides of a response, at most num_slides, without padding"""
+        slides = []
         
-        for block in blocks:
-            if not block.strip() or block.strip().isdigit():
-                continue
-            
-            # Title
-            title_match = re.search(r'Title:\s*(.+?)(?:\n|$)', block, re.IGNORECASE)
-            if title_match:
-                title = title_match.group(1).strip()
-                if len(title) > 70:
-                    title = title[:67] + "..."
-            else:
-                title = f"Topic {slide_num}"
-            
-            # Content
-            content_lines = []
-            for line in block.split('\n'):
-                line = line.strip()
-                if not line or 'title:' in line.lower():
-                    continue
-                if line.startswith(('-', '•', '*')):
-                    content = line.lstrip('-•*').strip()
-                    if len(content) > 140:
-                        content = content[:137] + "..."
-                    if content and len(content) > 15:
-                        content_lines.append(content)
-            
-            if len(content_lines) >= 2:
-                slides.append({
-                    "slide_number": slide_num,
-                    "title": title,
-                    "content": content_lines[:5],
-                    "visual_note": topic,
-                    "needs_image": False,
-                    "image_query": title
-                })
-                slide_num += 1
+        for raw_title, content_lines in self._slide_candidates(text):
+            if is_well_formed(content_lines):
+                slides.append(self._topic_slide(len(slides) + 1, raw_title, content_lines, topic))
                 if len(slides) >= num_slides:
                     break
         
+        return slides
+    
+    def _pad_topic_slides(self, slides: List[Dict], topic: str, num_slides: int) -> List[Dict]:
+        """Fill up to num_slides with placeholders"""
+        slides = list(slides)
         while len(slides) < num_slides:
-            slides.append({
-                "slide_number": len(slides) + 1,
-                "title": f"Topic {len(slides) + 1}",
-                "content": [
-                    f"Key information about {topic}",
-                    f"Important details and concepts",
-                    f"Relevant examples"
-                ],
-                "visual_note": topic,
-                "needs_image": False,
-                "image_query": topic
-            })
-        
+            slides.append(self._topic_filler_slide(len(slides) + 1, topic))
         return slides[:num_slides]
     
+    def _topic_filler_slide(self, slide_num: int, topic: str) -> Dict:
+        """Placeholder when the model produced fewer slides than asked"""
+        return {
+            "slide_number": slide_num,
+            "title": f"Topic {slide_num}",
+            "content": [
+                f"Key information about {topic}",
+                f"Important details and concepts",
+                f"Relevant examples"
+            ],
+            "visual_note": topic,
+            "needs_image": False,
+            "image_query": topic
+        }
+    
     def _parse_response_for_pdf(self, text: str, chapter_title: str, num_slides: int, chapter_number: int, total_slides_so_far: int) -> List[Dict]:
         """Parse for PDF"""
         slides = []
-        blocks = re.split(r'Slide\s+(\d+)', text, flags=re.IGNORECASE)
-        
-        if len(blocks) <= 2:
-            blocks = re.split(r'^(\d+)\.', text, flags=re.MULTILINE)
         
-        topic_num = 1
-        
-        for block in blocks:
-            if not block.strip() or block.strip().isdigit():
-                continue
-            
-            title_match = re.search(r'Title:\s*(.+?)(?:\n|$)', block, re.IGNORECASE)
-            if title_match:
-                raw = title_match.group(1).strip()
-                if len(raw) > 50:
-                    raw = raw[:47] + "..."
-                title = f"Topic {chapter_number}.{topic_num}: {raw}"
-            else:
-                title = f"Topic {chapter_number}.{topic_num}"
-            
-            content_lines = []
-            for line in block.split('\n'):
-                line = line.strip()
-                if not line or 'title:' in line.lower():
-                    continue
-                if line.startswith(('-', '•', '*')):
-                    content = line.lstrip('-•*').strip()
-                    if len(content) > 140:
-                        content = content[:137] + "..."
-                    if content and len(content) > 15:
-                        content_lines.append(content)
-            
-            if len(content_lines) >= 2:
-                slides.append({
-                    "slide_number": total_slides_so_far + topic_num,
-                    "title": title,
-                    "content": content_lines[:5],
-                    "visual_note": chapter_title,
-                    "needs_image": False,
-                    "image_query": chapter_title,
-                    "chapter": chapter_number
-                })
-                topic_num += 1
+        for raw_title, content_lines in self._slide_candidates(text):
+            if is_well_formed(content_lines):
+                slides.append(self._pdf_slide(
+                    len(slides) + 1, raw_title, content_lines,
+                    chapter_title, chapter_number, total_slides_so_far
+                ))
                 if len(slides) >= num_slides:
                     break
         
@@ -340,15 +691,11 @@ Create {num_slides} slides:"""
         """Direct extraction fallback"""
         print(f"📖 Direct extraction...")
         
-        sentences = re.split(r'[.!?]+', content)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 30]
+        from app.services.extractive import top_sentences
         
-        unique = []
-        seen = set()
-        for s in sentences:
-            if s.lower() not in seen:
-                unique.append(s)
-                seen.add(s.lower())
+        # The most central, non-redundant sentences, kept in reading order
+        unique, scores = top_sentences(content, num_slides * 4)
+        unique = [s.rstrip(".") for s in unique]
         
         slides = []
         per_slide = max(3, len(unique) // num_slides)
@@ -366,7 +713,8 @@ Create {num_slides} slides:"""
                     s = s[:137] + "..."
                 limited.append(s)
             
-            title_hint = slide_sents[0][:50] if slide_sents else "Info"
+            # Title from the group's most central sentence
+            title_hint = slide_sents[int(scores[start:end].argmax())][:50] if slide_sents else "Info"
             title_words = title_hint.split()[:8]
             slide_title = " ".join(title_words)
             if len(slide_title) > 60:
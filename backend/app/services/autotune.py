@@ -0,0 +1,175 @@
+"""Pick the fastest dtype / intra-op thread count for this host.
+
+    python -m app.services.autotune [--model Qwen/Qwen2.5-3B-Instruct]
+
+Runs a short greedy generation for every float32 / bfloat16 / float16 and
+thread-count combination, then stores the winner in AUTOTUNE_CONFIG.
+AIGenerator applies it on startup when the config matches this host and
+model; set AUTOTUNE_ON_STARTUP=1 to tune automatically when it doesn't.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from typing import Dict, List, Optional
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+from app.utils.helpers import ensure_dir
+
+AUTOTUNE_CONFIG = os.getenv("AUTOTUNE_CONFIG", "model_cache/autotune.json")
+AUTOTUNE_ON_STARTUP = os.getenv("AUTOTUNE_ON_STARTUP", "0") == "1"
+
+DTYPES = {
+    "float32": torch.float32,
+    "bfloat16": torch.bfloat16,
+    "float16": torch.float16
+}
+
+BENCHMARK_PROMPT = "Create 2 educational slides about photosynthesis with 3 bullet points each."
+
+
+def host_fingerprint() -> str:
+    """CPU model + core count - a tuning result only applies to matching hosts"""
+    cpu_model = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    cpu_model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return f"{cpu_model} x{os.cpu_count()}"
+
+
+def candidate_thread_counts() -> List[int]:
+    cores = os.cpu_count() or 1
+    return sorted({max(1, cores // 4), max(1, cores // 2), cores})
+
+
+def load_tuning(model_name: str) -> Optional[Dict]:
+    """Stored result for this host and model, if any"""
+    try:
+        with open(AUTOTUNE_CONFIG) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if config.get("host") != host_fingerprint() or config.get("model") != model_name:
+        return None
+    if config.get("dtype") not in DTYPES:
+        return None
+    return config
+
+
+def _tokens_per_second(model, tokenizer, inputs, max_new_tokens: int) -> float:
+    with torch.no_grad():
+        # Warm-up so one-off kernel selection isn't timed
+        model.generate(**inputs, max_new_tokens=4, do_sample=False, pad_token_id=tokenizer.eos_token_id)
+
+        start = time.perf_counter()
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            min_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+        elapsed = time.perf_counter() - start
+
+    generated = outputs.shape[1] - inputs["input_ids"].shape[1]
+    return generated / elapsed
+
+
+def autotune(model_name: str, trust_remote_code: bool = False, max_new_tokens: int = 24, thread_counts: Optional[List[int]] = None) -> Dict:
+    """Benchmark every dtype x thread combination and persist the fastest"""
+    thread_counts = thread_counts or candidate_thread_counts()
+    default_threads = torch.get_num_threads()
+
+    print(f"\n{'='*60}")
+    print(f"🎛️  AUTOTUNE: {model_name}")
+    print(f"🖥️  Host: {host_fingerprint()}")
+    print(f"🧵 Threads: {thread_counts}")
+    print(f"{'='*60}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=trust_remote_code)
+    text = tokenizer.apply_chat_template(
+        [{"role": "user", "content": BENCHMARK_PROMPT}],
+        tokenize=False,
+        add_generation_prompt=True
+    )
+    inputs = tokenizer(text, return_tensors="pt")
+
+    results = []
+    for dtype_name, dtype in DTYPES.items():
+        try:
+            model = AutoModelForCausalLM.from_pretrained(
+                model_name,
+                torch_dtype=dtype,
+                device_map="cpu",
+                trust_remote_code=trust_remote_code,
+                low_cpu_mem_usage=True
+            ).eval()
+        except Exception as e:
+            print(f"   ⚠️  {dtype_name}: load failed ({e})")
+            continue
+
+        for threads in thread_counts:
+            torch.set_num_threads(threads)
+            try:
+                tps = _tokens_per_second(model, tokenizer, inputs, max_new_tokens)
+            except Exception as e:
+                # e.g. fp16/bf16 kernels missing on this CPU
+                print(f"   ⚠️  {dtype_name} x{threads}: failed ({e})")
+                continue
+            print(f"   📊 {dtype_name:<9} x{threads:<3} {tps:6.2f} tok/s")
+            results.append({"dtype": dtype_name, "threads": threads, "tokens_per_second": round(tps, 2)})
+
+        del model
+
+    torch.set_num_threads(default_threads)
+
+    if not results:
+        raise RuntimeError("No dtype/thread combination could run on this host")
+
+    best = max(results, key=lambda r: r["tokens_per_second"])
+    config = {
+        "model": model_name,
+        "host": host_fingerprint(),
+        "dtype": best["dtype"],
+        "threads": best["threads"],
+        "tokens_per_second": best["tokens_per_second"],
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results
+    }
+
+    ensure_dir(os.path.dirname(AUTOTUNE_CONFIG) or ".")
+    with open(AUTOTUNE_CONFIG, "w") as f:
+        json.dump(config, f, indent=2)
+
+    print(f"✅ Selected {best['dtype']} with {best['threads']} threads ({best['tokens_per_second']} tok/s)")
+    print(f"💾 Saved to {AUTOTUNE_CONFIG}")
+    print(f"{'='*60}\n")
+    return config
+
+
+def resolve_tuning(model_name: str, trust_remote_code: bool = False) -> Optional[Dict]:
+    """Stored tuning for this host, autotuning first if enabled and missing"""
+    tuning = load_tuning(model_name)
+    if tuning is None and AUTOTUNE_ON_STARTUP:
+        try:
+            tuning = autotune(model_name, trust_remote_code)
+        except Exception as e:
+            print(f"⚠️  Autotune failed, using defaults: {e}")
+    return tuning
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick the fastest dtype and thread count for this host")
+    parser.add_argument("--model", default="Qwen/Qwen2.5-3B-Instruct")
+    parser.add_argument("--tokens", type=int, default=24, help="tokens decoded per measurement")
+    parser.add_argument("--threads", type=int, nargs="*", help="thread counts to try")
+    args = parser.parse_args()
+
+    autotune(args.model, trust_remote_code=True, max_new_tokens=args.tokens, thread_counts=args.threads)
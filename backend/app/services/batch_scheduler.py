@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+from app.services.model_registry import model_registry
+from app.services.worker_pool import PoolSaturatedError, inference_pool
+from app.services.instrumentation import SharedTrace, current_trace, use_trace
+
+
+class BatchScheduler:
+    """Dynamic micro-batching for topic generation.
+
+    Requests that arrive within `max_wait_ms` of the first queued one are
+    decoded together in a single left-padded `generate` call (up to
+    `max_batch_size`). A larger window trades per-request latency for
+    tokens/sec on CPU. At most `max_queue` requests may wait; more are
+    refused with PoolSaturatedError.
+    """
+
+    def __init__(self, max_batch_size: int = 4, max_wait_ms: float = 50, max_queue: int = 16):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.max_queue = max(1, max_queue)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Throughput counters
+        self.requests_total = 0
+        self.batches_total = 0
+        self.generated_tokens = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        print(f"🧺 Topic batching: up to {self.max_batch_size} requests / {self.max_wait_ms:.0f} ms window")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, topic: str, num_slides: int, custom_prompt: Optional[str] = None) -> List[Dict]:
+        """Queue one topic request and wait for its slides"""
+        if not self.is_running:
+            raise RuntimeError("Batch scheduler is not running")
+        if self._queue.qsize() >= self.max_queue:
+            raise PoolSaturatedError("Server busy (topic queue full), try again shortly", inference_pool.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        request = {
+            "topic": topic,
+            "num_slides": num_slides,
+            "custom_prompt": custom_prompt
+        }
+        await self._queue.put((request, future, time.perf_counter(), current_trace()))
+        return await future
+
+    async def _collect_batch(self) -> List:
+        """Block for the first request, then gather more until the window closes"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            started = time.perf_counter()
+            requests = [request for request, _, _, _ in batch]
+            traces = [trace for _, _, _, trace in batch if trace is not None]
+
+            for _, _, enqueued_at, trace in batch:
+                self.queue_wait_seconds += started - enqueued_at
+                if trace is not None:
+                    trace.record("queue_wait", started - enqueued_at)
+
+            try:
+                generator = model_registry.get_generator()
+                # Requests were admitted by submit(), so skip the pool's queue
+                # limit; stages of the shared decode go to every request's trace
+                with use_trace(SharedTrace(traces) if traces else None):
+                    results, generated = await inference_pool.run(
+                        generator.generate_slides_from_topics_batch, requests, admit=False
+                    )
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.busy_seconds += time.perf_counter() - started
+                self.batches_total += 1
+                self.requests_total += len(batch)
+
+            self.generated_tokens += generated
+            for (_, future, _, _), slides in zip(batch, results):
+                # The caller may have disconnected while we were decoding
+                if not future.done():
+                    future.set_result(slides)
+
+    def stats(self) -> Dict:
+        """Throughput snapshot for the metrics endpoint"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "requests": self.requests_total,
+            "batches": self.batches_total,
+            "avg_batch_size": round(self.requests_total / self.batches_total, 2) if self.batches_total else 0,
+            "generated_tokens": self.generated_tokens,
+            "tokens_per_second": round(self.generated_tokens / self.busy_seconds, 2) if self.busy_seconds else 0,
+            "avg_queue_wait_ms": round(self.queue_wait_seconds / self.requests_total * 1000, 1) if self.requests_total else 0
+        }
+
+
+topic_scheduler = BatchScheduler(
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "4")),
+    max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "50")),
+    max_queue=int(os.getenv("BATCH_MAX_QUEUE", "16"))
+)
@@ -0,0 +1,201 @@
+"""Pre-converted, memory-mapped model checkpoints for fast cold starts.
+
+`from_pretrained` reads the hub checkpoint, casts it to the target dtype
+and copies every tensor into freshly allocated memory on each start. This
+converts a model once into a single safetensors file already in the final
+dtype (plus config and tokenizer), and loads it by memory-mapping that file:
+weights page in on first touch, and every worker on the host shares the
+same page-cache copy instead of holding its own.
+
+    python -m app.services.checkpoint_cache --convert
+    python -m app.services.checkpoint_cache --convert --model TinyLlama/TinyLlama-1.1B-Chat-v1.0 --dtype bfloat16
+
+TransformersBackend uses a matching checkpoint automatically when one
+exists (CHECKPOINT_CACHE=0 disables this).
+"""
+import argparse
+import json
+import mmap
+import os
+import shutil
+import time
+from typing import Dict, Optional
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, GenerationConfig
+from app.services.autotune import DTYPES, load_tuning
+from app.utils.helpers import ensure_dir
+
+CHECKPOINT_CACHE_ENABLED = os.getenv("CHECKPOINT_CACHE", "1") == "1"
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "model_cache/checkpoints")
+
+WEIGHTS_FILE = "model.safetensors"
+MANIFEST_FILE = "checkpoint.json"
+
+# safetensors dtype codes for the dtypes a checkpoint can hold
+SAFETENSORS_DTYPES = {
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+
+
+def checkpoint_path(model_name: str, dtype_name: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{model_name.replace('/', '--')}-{dtype_name}")
+
+
+def convert(model_name: str, dtype_name: str, trust_remote_code: bool = False) -> str:
+    """Write model weights (in dtype_name), config and tokenizer to the cache"""
+    from safetensors.torch import save_file
+
+    path = checkpoint_path(model_name, dtype_name)
+    print(f"⚙️  Converting {model_name} to a {dtype_name} checkpoint...")
+    start = time.perf_counter()
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=trust_remote_code)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        torch_dtype=DTYPES[dtype_name],
+        device_map="cpu",
+        trust_remote_code=trust_remote_code,
+        low_cpu_mem_usage=True
+    )
+
+    # Tied weights (e.g. lm_head = embed_tokens) are stored once; the other
+    # names are recorded as aliases and point at the same tensor on load
+    tensors: Dict[str, torch.Tensor] = {}
+    aliases: Dict[str, str] = {}
+    owners: Dict[int, str] = {}
+    for name, tensor in model.state_dict().items():
+        owner = owners.get(tensor.data_ptr()) if tensor.numel() else None
+        if owner is not None:
+            aliases[name] = owner
+            continue
+        owners[tensor.data_ptr()] = name
+        tensors[name] = tensor.contiguous()
+
+    staging = path + ".tmp"
+    ensure_dir(staging)
+    save_file(tensors, os.path.join(staging, WEIGHTS_FILE), metadata={"aliases": json.dumps(aliases)})
+    model.config.save_pretrained(staging)
+    model.generation_config.save_pretrained(staging)
+    tokenizer.save_pretrained(staging)
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump({
+            "model": model_name,
+            "dtype": dtype_name,
+            "trust_remote_code": trust_remote_code,
+            "torch": torch.__version__,
+            "created": time.time()
+        }, f, indent=2)
+
+    # Swap in the finished directory so a crashed conversion is never loaded
+    if os.path.exists(path):
+        old = path + ".old"
+        os.replace(path, old)
+        os.replace(staging, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(staging, path)
+
+    size_mb = os.path.getsize(os.path.join(path, WEIGHTS_FILE)) / (1024 * 1024)
+    print(f"   ✅ Converted in {time.perf_counter() - start:.1f}s ({size_mb:.0f} MB)")
+    print(f"   💾 Saved to {path}")
+    return path
+
+
+def find_checkpoint(model_name: str, dtype_name: str) -> Optional[str]:
+    """Directory of a complete checkpoint for this model and dtype, if any"""
+    if not CHECKPOINT_CACHE_ENABLED:
+        return None
+    path = checkpoint_path(model_name, dtype_name)
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("model") != model_name or manifest.get("dtype") != dtype_name:
+        return None
+    return path
+
+
+def mmap_state_dict(weights_path: str) -> Dict[str, torch.Tensor]:
+    """Tensors viewing a copy-on-write mapping of a safetensors file.
+
+    Nothing is read up front: pages are faulted in as the model touches
+    them and stay shared with every other process mapping the same file.
+    """
+    with open(weights_path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header_len = int.from_bytes(buffer[:8], "little")
+    header = json.loads(buffer[8:8 + header_len])
+    metadata = header.pop("__metadata__", None) or {}
+    data_start = 8 + header_len
+
+    state_dict = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        if count == 0:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        state_dict[name] = torch.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + begin).view(info["shape"])
+
+    for alias, owner in json.loads(metadata.get("aliases", "{}")).items():
+        state_dict[alias] = state_dict[owner]
+    return state_dict
+
+
+def load_checkpoint(path: str, trust_remote_code: bool = False):
+    """(model, tokenizer) from a converted checkpoint, weights memory-mapped"""
+    from accelerate import init_empty_weights
+
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    dtype = DTYPES[manifest["dtype"]]
+
+    tokenizer = AutoTokenizer.from_pretrained(path, trust_remote_code=trust_remote_code)
+    config = AutoConfig.from_pretrained(path, trust_remote_code=trust_remote_code)
+
+    # Parameters are created on the meta device (no allocation, no random
+    # init) and then replaced by the mapped tensors themselves
+    with init_empty_weights():
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=dtype, trust_remote_code=trust_remote_code)
+
+    state_dict = mmap_state_dict(os.path.join(path, WEIGHTS_FILE))
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+    if result.unexpected_keys:
+        raise RuntimeError(f"Checkpoint has unexpected weights: {result.unexpected_keys[:5]}")
+    model.tie_weights()
+
+    still_empty = [name for name, param in model.named_parameters() if param.is_meta]
+    if still_empty:
+        raise RuntimeError(f"Checkpoint is missing weights: {still_empty[:5]}")
+
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(path)
+    except OSError:
+        pass
+    return model.eval(), tokenizer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped model checkpoint cache")
+    parser.add_argument("--convert", action="store_true", help="convert a model into the cache")
+    parser.add_argument("--model", default="Qwen/Qwen2.5-3B-Instruct", help="hub model id")
+    parser.add_argument("--dtype", choices=sorted(DTYPES), help="defaults to the autotuned dtype, else float16")
+    parser.add_argument("--trust-remote-code", action="store_true")
+    args = parser.parse_args()
+
+    if not args.convert:
+        parser.error("nothing to do (use --convert)")
+
+    tuning = load_tuning(args.model)
+    dtype_name = args.dtype or (tuning["dtype"] if tuning else "float16")
+    convert(args.model, dtype_name, args.trust_remote_code)
@@ -0,0 +1,75 @@
+"""Token-aware splitting of long chapter text.
+
+Chunks follow the text's own structure: paragraphs are packed together
+until the token budget is reached, an oversized paragraph is split at
+sentence ends, and only a single oversized sentence is split by words.
+"""
+import re
+from typing import Callable, List, Tuple
+
+TokenCounter = Callable[[str], int]
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _pieces(text: str, count_tokens: TokenCounter, max_tokens: int) -> List[Tuple[str, int]]:
+    """(piece, tokens) for paragraphs, sentences or word runs within max_tokens"""
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens <= max_tokens:
+            pieces.append((paragraph, tokens))
+            continue
+
+        for sentence in _SENTENCE_END.split(paragraph):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                pieces.append((sentence, tokens))
+                continue
+
+            # Words are counted one by one (with their leading space) so a
+            # huge unpunctuated run, common in OCR output, stays linear
+            run: List[str] = []
+            run_tokens = 0
+            for word in sentence.split():
+                word_tokens = count_tokens(" " + word)
+                if run and run_tokens + word_tokens > max_tokens:
+                    pieces.append((" ".join(run), run_tokens))
+                    run, run_tokens = [], 0
+                run.append(word)
+                run_tokens += word_tokens
+            if run:
+                pieces.append((" ".join(run), run_tokens))
+    return pieces
+
+
+def split_into_chunks(text: str, count_tokens: TokenCounter, max_tokens: int) -> List[str]:
+    """Consecutive chunks of text, each at most max_tokens by count_tokens"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for piece, tokens in _pieces(text, count_tokens, max_tokens):
+        # +1 for the separator; exact counts of the joined text can differ
+        # by a token or two at boundaries, which the budgets leave room for
+        if current and current_tokens + tokens + 1 > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens + 1
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def truncate_to_tokens(text: str, count_tokens: TokenCounter, max_tokens: int) -> str:
+    """Leading part of text within max_tokens, cut at a paragraph or sentence end"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    chunks = split_into_chunks(text, count_tokens, max_tokens)
+    return chunks[0] if chunks else ""
@@ -0,0 +1,36 @@
+"""Extracted PDF text and chapters, keyed by the file's contents.
+
+Re-uploading a PDF would otherwise repeat text extraction and, for scanned
+documents, minutes of OCR. Entries hold the per-page text and the detected
+chapters under a key over the upload's sha256 (computed while the spooled
+upload is copied to UPLOAD_DIR) plus the extractor version and settings, so changing either makes
+old entries unreachable. Storage, expiry and trimming work like the slide
+cache.
+"""
+import os
+from typing import Dict
+from app.services.slide_cache import SlideCache, cache_key
+
+
+class ExtractionCache(SlideCache):
+    """Per-page text and chapters of PDFs already processed"""
+
+    record_field = "extraction"
+
+    @classmethod
+    def from_env(cls) -> "ExtractionCache":
+        return cls(
+            cache_dir=os.getenv("EXTRACTION_CACHE_DIR", "model_cache/extraction") or None,
+            memory_entries=int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", "16")),
+            ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL", str(30 * 24 * 3600))),
+            max_disk_mb=float(os.getenv("EXTRACTION_CACHE_MAX_MB", "512")),
+            enabled=os.getenv("EXTRACTION_CACHE", "1") == "1"
+        )
+
+
+def extraction_key(sha256: str, settings: Dict) -> str:
+    return cache_key(sha256=sha256, **settings)
+
+
+# Shared by every request in this process
+extraction_cache = ExtractionCache.from_env()
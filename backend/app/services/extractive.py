@@ -0,0 +1,177 @@
+"""Extractive sentence ranking with NumPy (TF-IDF + TextRank).
+
+Used to shrink chapter text before it reaches the model - prefill cost on
+CPU grows with prompt length - and as the no-model fallback for building
+slides. Sentences are scored by centrality: TextRank over the TF-IDF cosine
+graph, or similarity to the document centroid when there are too many
+sentences for an n x n graph. Everything is vectorized; there is no Python
+loop over sentence pairs.
+"""
+import re
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+# Above this many sentences the n x n similarity graph gets expensive and
+# centroid similarity is used instead
+TEXTRANK_MAX_SENTENCES = 1500
+MAX_FEATURES = 2048
+MIN_SENTENCE_CHARS = 30
+# Sentences this similar to one already picked add nothing new
+REDUNDANCY_THRESHOLD = 0.8
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n|\n(?=\s*(?:[-•*]|\d+[.)])\s)")
+_WORD = re.compile(r"[a-z0-9][a-z0-9'-]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just let me more most my myself
+no nor not now of off on once only or other our ours ourselves out over own same she should so some such
+than that the their theirs them themselves then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours yourself
+one two may might must shall upon within without per via etc e.g i.e
+""".split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of at least MIN_SENTENCE_CHARS, whitespace-collapsed, without repeats"""
+    sentences = []
+    seen = set()
+    for raw in _SENTENCE_END.split(text):
+        sentence = " ".join(raw.split())
+        key = sentence.lower()
+        if len(sentence) < MIN_SENTENCE_CHARS or key in seen:
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+    return sentences
+
+
+def tfidf_matrix(sentences: List[str]) -> np.ndarray:
+    """Row-normalized TF-IDF vectors (sentences x terms), float32.
+
+    Only terms that occur in at least two sentences are kept (a term in a
+    single sentence can't link it to any other), capped at the
+    MAX_FEATURES most widespread ones.
+    """
+    rows, terms = [], []
+    for row, sentence in enumerate(sentences):
+        for word in _WORD.findall(sentence.lower()):
+            if word not in STOPWORDS:
+                rows.append(row)
+                terms.append(word)
+    if not terms:
+        return np.zeros((len(sentences), 0), dtype=np.float32)
+
+    vocabulary, term_ids = np.unique(np.array(terms), return_inverse=True)
+    num_terms = len(vocabulary)
+
+    # Distinct (sentence, term) pairs and their counts; document frequency
+    # comes from these, so the dense matrix is only allocated for the terms
+    # that survive the cut (a whole book has tens of thousands of terms)
+    pairs, pair_counts = np.unique(np.array(rows, dtype=np.int64) * num_terms + term_ids, return_counts=True)
+    pair_rows, pair_terms = np.divmod(pairs, num_terms)
+    df = np.bincount(pair_terms, minlength=num_terms)
+
+    keep = np.flatnonzero(df >= 2)
+    if keep.size > MAX_FEATURES:
+        keep = keep[np.argsort(-df[keep], kind="stable")[:MAX_FEATURES]]
+
+    column = np.full(num_terms, -1, dtype=np.int64)
+    column[keep] = np.arange(keep.size)
+    kept = column[pair_terms] >= 0
+    pair_rows, pair_columns, pair_counts = pair_rows[kept], column[pair_terms[kept]], pair_counts[kept]
+
+    # Weights and row norms are computed on the nonzeros only; the dense
+    # matrix is written once, already normalized
+    idf = np.log((1.0 + len(sentences)) / (1.0 + df[keep])) + 1.0
+    values = (1.0 + np.log(pair_counts)) * idf[pair_columns]
+    norms = np.sqrt(np.bincount(pair_rows, weights=values ** 2, minlength=len(sentences)))
+
+    weights = np.zeros((len(sentences), keep.size), dtype=np.float32)
+    weights[pair_rows, pair_columns] = values / np.where(norms > 0, norms, 1.0)[pair_rows]
+    return weights
+
+
+def textrank(matrix: np.ndarray, damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-6) -> np.ndarray:
+    """PageRank over the cosine-similarity graph of the sentence vectors"""
+    n = matrix.shape[0]
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+
+    # Sentences sharing nothing with the rest link uniformly
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1.0), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1.0 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def rank_sentences(text: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(sentences in document order, centrality scores, TF-IDF matrix)"""
+    sentences = split_sentences(text)
+    if not sentences:
+        return sentences, np.zeros(0, dtype=np.float32), np.zeros((0, 0), dtype=np.float32)
+
+    matrix = tfidf_matrix(sentences)
+    if matrix.shape[1] == 0 or len(sentences) < 3:
+        # Nothing to compare - keep the document's own order of importance
+        scores = np.linspace(1.0, 0.5, len(sentences), dtype=np.float32)
+    elif len(sentences) <= TEXTRANK_MAX_SENTENCES:
+        scores = textrank(matrix)
+    else:
+        centroid = matrix.mean(axis=0)
+        scores = matrix @ (centroid / (np.linalg.norm(centroid) or 1.0))
+    return sentences, scores, matrix
+
+
+def select(scores: np.ndarray, matrix: np.ndarray, fits: Optional[Callable[[int], bool]] = None, max_count: Optional[int] = None) -> List[int]:
+    """Indices of the best sentences, skipping near-duplicates, in document order.
+
+    `fits(i)` is asked for each candidate in score order and returns False
+    when sentence i no longer fits the caller's budget.
+    """
+    chosen: List[int] = []
+    # Highest similarity of every sentence to anything chosen so far
+    closest = np.zeros(len(scores), dtype=np.float32)
+    for i in np.argsort(-scores, kind="stable"):
+        if max_count is not None and len(chosen) >= max_count:
+            break
+        if closest[i] > REDUNDANCY_THRESHOLD or (fits and not fits(int(i))):
+            continue
+        chosen.append(int(i))
+        if matrix.shape[1]:
+            np.maximum(closest, matrix @ matrix[i], out=closest)
+    return sorted(chosen)
+
+
+def extractive_summary(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> str:
+    """The most central sentences of text within max_tokens, in their original order"""
+    sentences, scores, matrix = rank_sentences(text)
+    if not sentences:
+        return text
+
+    used = 0
+
+    def fits(i: int) -> bool:
+        nonlocal used
+        tokens = count_tokens(sentences[i]) + 1
+        if used + tokens > max_tokens:
+            return False
+        used += tokens
+        return True
+
+    chosen = select(scores, matrix, fits=fits)
+    return "\n".join(sentences[i] for i in chosen) if chosen else text
+
+
+def top_sentences(text: str, count: int) -> Tuple[List[str], np.ndarray]:
+    """Up to `count` non-redundant central sentences in document order, with their scores"""
+    sentences, scores, matrix = rank_sentences(text)
+    chosen = select(scores, matrix, max_count=count)
+    return [sentences[i] for i in chosen], scores[chosen]
@@ -0,0 +1,83 @@
+"""Import-time budget for the API process.
+
+Importing app.main must stay cheap: uvicorn reloads, worker start-up and
+the health endpoints all wait on it. The model stack, PDF/OCR libraries
+and python-pptx are imported on first use instead. This check runs
+`python -X importtime` in a fresh interpreter and fails if app.main takes
+longer than the budget or pulls in any of the heavy modules:
+
+    python -m app.services.import_budget
+    python -m app.services.import_budget --budget-ms 800 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+# Top-level packages that must not be imported by `import app.main`
+HEAVY_MODULES = (
+    "torch", "transformers", "diffusers", "accelerate", "safetensors",
+    "PyPDF2", "pdf2image", "pytesseract", "tesserocr", "fitz", "pymupdf",
+    "PIL", "pptx", "numpy", "httpx"
+)
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def measure(module: str = "app.main") -> List[Dict]:
+    """Import `module` in a fresh interpreter; one entry per imported module"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": backend_dir}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return entries
+
+
+def check(module: str = "app.main", budget_ms: float = DEFAULT_BUDGET_MS, top: int = 10) -> bool:
+    entries = measure(module)
+    total_ms = next((e["cumulative_ms"] for e in entries if e["module"] == module), 0.0)
+    heavy = sorted({e["module"] for e in entries if e["module"].split(".")[0] in HEAVY_MODULES})
+
+    print(f"⏱️  import {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    print(f"   Slowest packages (cumulative):")
+    top_level = [e for e in entries if e["module"].count(".") == 0]
+    for entry in sorted(top_level, key=lambda e: e["cumulative_ms"], reverse=True)[:top]:
+        print(f"   {entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+
+    ok = True
+    if heavy:
+        ok = False
+        print(f"❌ Heavy modules imported eagerly: {', '.join(heavy[:20])}")
+    if total_ms > budget_ms:
+        ok = False
+        print(f"❌ Over budget by {total_ms - budget_ms:.0f} ms")
+    if ok:
+        print(f"✅ Within budget, no heavy modules imported")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the API")
+    parser.add_argument("--module", default="app.main", help="module to import")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="maximum cumulative import time")
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list")
+    args = parser.parse_args()
+
+    sys.exit(0 if check(args.module, args.budget_ms, args.top) else 1)
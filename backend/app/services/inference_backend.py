@@ -0,0 +1,72 @@
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Decode budget: a slide block is ~150 tokens, plus slack for preamble
+MAX_NEW_TOKENS = 2000
+TOKENS_PER_SLIDE = int(os.getenv("TOKENS_PER_SLIDE", "150"))
+
+# "transformers" (in-process) or "openai" (OpenAI-compatible HTTP server)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "transformers").lower()
+
+# Rough size of a token when the backend can't tokenize locally
+CHARS_PER_TOKEN = 4
+
+def token_budget(num_slides: int) -> int:
+    """max_new_tokens needed for num_slides slides"""
+    return min(MAX_NEW_TOKENS, TOKENS_PER_SLIDE * num_slides + 64)
+
+
+class InferenceBackend:
+    """What AIGenerator needs from a model runtime.
+
+    Prompts are dicts with `system`, `static` (the request-independent
+    leading part of the user message) and `variable` (the per-request
+    tail). Backends that can reuse work across requests key it on the
+    system + static part.
+    """
+
+    model_name: str = "unknown"
+    # Part of every cache key, so only settings that change the output
+    runtime: Dict = {}
+    # Seconds per startup phase, reported at /api/health/ready
+    startup_seconds: Dict = {}
+    # Prompt + completion tokens the model accepts
+    context_window: int = 8192
+
+    def warmup(self, prompts: List[Dict], structured: bool = False):
+        """Prepare for traffic; `prompts` are representative requests"""
+        raise NotImplementedError
+
+    def generate(self, prompts: List[Dict], temperature: float, slide_targets: Optional[List[int]] = None, max_new_tokens: Optional[int] = None, structured: bool = False) -> Tuple[List[str], int]:
+        """Complete every prompt; returns the texts and total generated tokens.
+
+        With slide_targets, each completion may stop as soon as it holds
+        that many finished slides. With structured, completions are
+        constrained to slides_json_schema (needs slide_targets).
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: Dict, temperature: float, num_slides: int, structured: bool = False) -> Iterator[str]:
+        """Yield text chunks of one completion as they are decoded"""
+        raise NotImplementedError
+
+    def count_tokens(self, text: str) -> int:
+        """Prompt tokens `text` occupies (an estimate unless overridden)"""
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+    def stats(self) -> Dict:
+        return {"backend": self.__class__.__name__}
+
+    def close(self):
+        """Release connections and threads (after a failed warm-up too)"""
+
+
+def create_backend() -> InferenceBackend:
+    """Backend selected by INFERENCE_BACKEND"""
+    # Imported lazily so the HTTP backend never pulls in torch/transformers
+    if INFERENCE_BACKEND == "openai":
+        from app.services.openai_backend import OpenAIBackend
+        return OpenAIBackend.from_env()
+
+    from app.services.transformers_backend import TransformersBackend
+    return TransformersBackend()
@@ -0,0 +1,116 @@
+"""Per-request stage timings and token counts.
+
+A Trace lives in a contextvar, so it follows the request into worker pool
+threads (WorkerPool copies the caller's context) and into tasks it starts.
+Code anywhere on the request path wraps a stage:
+
+    with stage("decode") as counts:
+        ...
+        counts["output_tokens"] = generated
+
+Outside a traced request `stage` costs one contextvar lookup. Stages may
+nest (OCR runs inside text extraction), so their times don't add up to
+the total. Repeated stages accumulate calls, time and counts.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+
+# Counts kept as a maximum rather than summed across calls
+PEAK_COUNTS = frozenset({"batch_size"})
+
+
+class Trace:
+    """Stage timings and counters of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, **counts):
+        with self._lock:
+            entry = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            for key, value in counts.items():
+                # Sizes are peaks, everything else accumulates
+                if key in PEAK_COUNTS:
+                    entry[key] = max(entry.get(key, 0), value)
+                else:
+                    entry[key] = entry.get(key, 0) + value
+
+    def summary(self) -> Dict:
+        """JSON-ready totals, stages in the order they first ran"""
+        with self._lock:
+            stages = {
+                name: {"ms": round(entry["seconds"] * 1000, 1), **{k: v for k, v in entry.items() if k != "seconds"}}
+                for name, entry in self.stages.items()
+            }
+        return {"total_ms": round((time.perf_counter() - self.started) * 1000, 1), "stages": stages}
+
+
+class SharedTrace:
+    """Records into every trace of a batch (decoded together for several requests)"""
+
+    def __init__(self, traces: List[Trace]):
+        self.traces = traces
+
+    def record(self, name: str, seconds: float, **counts):
+        for trace in self.traces:
+            trace.record(name, seconds, batch_size=len(self.traces), **counts)
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def start_trace() -> Trace:
+    """Begin tracing the current request (replaces any trace in this context)"""
+    trace = Trace()
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def use_trace(trace):
+    """Make `trace` (a Trace, SharedTrace or None) current inside the block"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str, **counts) -> Iterator[Dict]:
+    """Time the block as `name`; counts set on the yielded dict are recorded too"""
+    trace = _current.get()
+    if trace is None:
+        yield counts
+        return
+
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        trace.record(name, time.perf_counter() - start, **counts)
+
+
+def record(name: str, seconds: float = 0.0, **counts):
+    """Add a stage measured elsewhere (e.g. queue wait) to the current trace"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, seconds, **counts)
+
+
+def timings() -> Optional[Dict]:
+    """Summary of the current trace, for attaching to a response"""
+    trace = _current.get()
+    return trace.summary() if isinstance(trace, Trace) else None
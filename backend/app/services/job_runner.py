@@ -0,0 +1,174 @@
+import asyncio
+import os
+import socket
+import traceback
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from app.services.job_store import JobStore, QUEUED, RUNNING, SUCCEEDED, FAILED
+from app.services.model_registry import model_registry
+from app.services.worker_pool import PoolSaturatedError
+
+# handler(params, report) -> result; report(stage, **info) records progress
+JobHandler = Callable[[Dict, Callable[..., None]], Awaitable[Dict]]
+
+
+class JobRunner:
+    """Background execution of persisted generation jobs.
+
+    The SQLite store is the queue: each worker claims the oldest queued
+    job atomically, so several server processes can share one store
+    without running a job twice. A running job's lease is renewed while
+    it runs; jobs whose owner stopped renewing (crashed or killed) are
+    queued again, and one interrupted `max_attempts` times is marked
+    failed instead.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = 1, max_queued: int = 100,
+                 max_attempts: int = 3, retention_days: float = 7,
+                 lease_seconds: float = 60, poll_seconds: float = 5):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        # Identifies this process's claims in the shared store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        """Take back abandoned jobs and start the workers on the running loop"""
+        if self._workers:
+            return
+        if self.retention_days > 0:
+            await asyncio.to_thread(self.store.purge, self.retention_days * 24 * 3600)
+
+        recovered = await asyncio.to_thread(self.store.recover, self.max_attempts)
+        queued = await asyncio.to_thread(self.store.count, QUEUED)
+        self._wake = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        print(f"🗂️  Job runner: {self.concurrency} worker(s), {recovered} job(s) recovered, {queued} queued")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        # Jobs cut off here go back to the queue for the next process that runs
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    async def submit(self, kind: str, params: Dict) -> Dict:
+        """Persist a new job and wake a worker"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._wake is None:
+            raise RuntimeError("Job runner is not running")
+        if await asyncio.to_thread(self.store.count, QUEUED) >= self.max_queued:
+            raise PoolSaturatedError("Server busy (job queue full), try again later", 30)
+
+        job = await asyncio.to_thread(self.store.create, kind, params)
+        self._wake.set()
+        return job
+
+    async def _wait_for_model(self):
+        """Recovered jobs may start before the model has finished loading"""
+        while not model_registry.is_ready:
+            if model_registry.state == "failed" and not model_registry.retrying:
+                raise RuntimeError(f"Model failed to load: {model_registry.error}")
+            await asyncio.sleep(1)
+
+    async def _work(self):
+        while True:
+            # Cleared before looking, so a submit in between isn't missed
+            self._wake.clear()
+            job = await asyncio.to_thread(self.store.claim_next, self.owner, self.lease_seconds)
+            if job is not None:
+                await self._run(job)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                # Idle: pick up jobs other processes queued or abandoned
+                await asyncio.to_thread(self.store.recover, self.max_attempts)
+
+    async def _keep_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.renew, job_id, self.owner, self.lease_seconds):
+                print(f"⚠️  Lost the lease on job {job_id}")
+                return
+
+    async def _run(self, job: Dict):
+        job_id = job["id"]
+        # Handlers report from the event loop, so progress is written in the
+        # background: one write at a time, skipping stages already superseded
+        latest: List[Dict] = []
+        writer: Optional[asyncio.Task] = None
+
+        async def write_progress():
+            while latest:
+                progress = latest.pop()
+                await asyncio.to_thread(self.store.update, job_id, owner=self.owner, progress=progress)
+
+        def report(stage: str, **info):
+            nonlocal writer
+            latest[:] = [{"stage": stage, **info}]
+            if writer is None or writer.done():
+                writer = asyncio.create_task(write_progress())
+
+        async def finish(**fields):
+            # After any progress write still in flight, so "done" isn't overwritten
+            if writer is not None:
+                await writer
+            await asyncio.to_thread(self.store.update, job_id, owner=self.owner, **fields)
+
+        lease = asyncio.create_task(self._keep_lease(job_id))
+        try:
+            await self._wait_for_model()
+            report("started")
+            while True:
+                try:
+                    result = await self._handlers[job["kind"]](job["params"], report)
+                    break
+                except PoolSaturatedError as e:
+                    # Not the job's fault - keep the claim, wait for capacity, try again
+                    report("waiting", retry_after=e.retry_after)
+                    await asyncio.sleep(e.retry_after)
+            await finish(status=SUCCEEDED, result=result, progress={"stage": "done"})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            await finish(status=FAILED, error=str(e))
+        finally:
+            lease.cancel()
+            if writer is not None:
+                writer.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.concurrency,
+            "queued": self.store.count(QUEUED),
+            "running": self.store.count(RUNNING),
+            "succeeded": self.store.count(SUCCEEDED),
+            "failed": self.store.count(FAILED)
+        }
+
+
+job_runner = JobRunner(
+    JobStore(os.getenv("JOB_STORE_PATH", "data/jobs.sqlite3")),
+    concurrency=int(os.getenv("JOB_WORKERS", "1")),
+    max_queued=int(os.getenv("JOB_MAX_QUEUED", "100")),
+    retention_days=float(os.getenv("JOB_RETENTION_DAYS", "7")),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60"))
+)
@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+from app.utils.helpers import ensure_dir
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+"""
+
+JSON_COLUMNS = ("params", "progress", "result")
+
+# Added after the first release; older files get them on open
+MIGRATED_COLUMNS = {"owner": "TEXT", "lease_until": "REAL"}
+
+
+class JobStore:
+    """Generation jobs persisted in a local SQLite file.
+
+    Every state change is committed immediately, so jobs that were queued
+    or running when the process stopped are picked up again on start.
+    Several processes may share one file: a job is claimed atomically by
+    one owner, which holds a lease on it while running and renews it;
+    only jobs whose lease ran out (owner gone) are taken over.
+    """
+
+    def __init__(self, path: str = "data/jobs.sqlite3"):
+        self.path = path
+        if os.path.dirname(path):
+            ensure_dir(os.path.dirname(path))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in MIGRATED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+    def _row(self, row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def create(self, kind: str, params: Dict) -> Dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), now, now)
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def update(self, job_id: str, owner: Optional[str] = None, **fields) -> bool:
+        """Set columns of one job; dict values are stored as JSON.
+
+        With owner, only while that owner still holds the job. Returns
+        whether a row was updated.
+        """
+        fields["updated_at"] = time.time()
+        if fields.get("status") in (SUCCEEDED, FAILED):
+            fields["finished_at"] = fields["updated_at"]
+        for column in JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column])
+
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        args = [*fields.values(), job_id]
+        if owner is not None:
+            query += " AND owner = ?"
+            args.append(owner)
+        with self._lock:
+            cursor = self._conn.execute(query, args)
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Mark a queued job running for owner; False if someone else got it first"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, owner, now + lease_seconds, now, job_id, QUEUED)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def claim_next(self, owner: str, lease_seconds: float) -> Optional[Dict]:
+        """Claim the oldest queued job, or None when there is none left"""
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+            if row is None:
+                return None
+            # Lost the race to another worker - try the next one
+            if self.claim(row["id"], owner, lease_seconds):
+                return self.get(row["id"])
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend owner's lease on a running job; False if it no longer holds it"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time() + lease_seconds, job_id, owner, RUNNING)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Newest first, optionally filtered by status"""
+        query = "SELECT * FROM jobs"
+        args: list = []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._row(row) for row in rows]
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def recover(self, max_attempts: int) -> int:
+        """Take back running jobs whose owner is gone (lease expired).
+
+        Each is queued again, or failed once it has been interrupted
+        max_attempts times. Returns the number queued again.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Interrupted ' || attempts || ' times, giving up', "
+                "finished_at = ?, updated_at = ? "
+                "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) AND attempts >= ?",
+                (FAILED, now, now, RUNNING, now, max_attempts)
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, now, RUNNING, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def release(self, owner: str) -> int:
+        """Queue owner's running jobs again right away (clean shutdown)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, updated_at = ? WHERE status = ? AND owner = ?",
+                (QUEUED, time.time(), RUNNING, owner)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than the retention window"""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, cutoff)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from app.services.ai_generator import AIGenerator
+from app.utils.helpers import get_rss_mb
+
+# A failed load or warm-up is retried after this long, doubling up to the max
+# (e.g. an inference server that comes up after the API); 0 disables retries
+LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "5"))
+LOAD_RETRY_MAX_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_MAX_SECONDS", "60"))
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a generator is requested before warm-up has finished"""
+
+
+class ModelRegistry:
+    """Process-wide owner of the AI model - loads weights once and shares them"""
+
+    def __init__(self):
+        self.generator: Optional[AIGenerator] = None
+        self.state = "not_loaded"  # not_loaded | loading | warming_up | ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.rss_before_mb: Optional[float] = None
+        self.rss_after_mb: Optional[float] = None
+        self.attempts = 0
+        # Set while keep_loading() will try again after a failure
+        self.retrying = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def load(self) -> Optional[AIGenerator]:
+        """Load weights and warm up (blocking). Safe to call more than once."""
+        with self._lock:
+            if self.generator is not None:
+                return self.generator
+
+            print(f"\n{'='*60}")
+            print(f"📦 MODEL REGISTRY: loading shared generator")
+            print(f"{'='*60}")
+
+            self.state = "loading"
+            self.error = None
+            self.attempts += 1
+            self.rss_before_mb = get_rss_mb()
+
+            generator = None
+            try:
+                start = time.perf_counter()
+                generator = AIGenerator()
+                self.load_seconds = time.perf_counter() - start
+
+                self.state = "warming_up"
+                start = time.perf_counter()
+                generator.warmup()
+                self.warmup_seconds = time.perf_counter() - start
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                print(f"❌ Model load failed: {e}")
+                if generator is not None:
+                    generator.backend.close()
+                return None
+
+            self.rss_after_mb = get_rss_mb()
+            self.generator = generator
+            self.state = "ready"
+
+            print(f"✅ Model ready: {generator.model_name}")
+            print(f"   ⏱️  Load: {self.load_seconds:.1f}s | Warm-up: {self.warmup_seconds:.1f}s")
+            print(f"   💾 RSS: {self.rss_before_mb:.0f} MB → {self.rss_after_mb:.0f} MB")
+            print(f"{'='*60}\n")
+
+            return generator
+
+    def keep_loading(self, stop: threading.Event) -> Optional[AIGenerator]:
+        """load(), retried with backoff until it succeeds or `stop` is set (blocking)"""
+        delay = LOAD_RETRY_SECONDS
+        self.retrying = delay > 0
+        try:
+            while True:
+                generator = self.load()
+                if generator is not None or not self.retrying:
+                    return generator
+                print(f"🔁 Retrying model load in {delay:.0f}s")
+                if stop.wait(delay):
+                    return None
+                delay = min(delay * 2, max(LOAD_RETRY_MAX_SECONDS, LOAD_RETRY_SECONDS))
+        finally:
+            self.retrying = False
+
+    def get_generator(self) -> AIGenerator:
+        """Return the shared generator, refusing until warm-up has finished"""
+        if not self.is_ready:
+            raise ModelNotReadyError(f"Model is {self.state.replace('_', ' ')}")
+        return self.generator
+
+    def status(self) -> Dict:
+        """Readiness snapshot for the health endpoint"""
+        return {
+            "ready": self.is_ready,
+            "state": self.state,
+            "load_attempts": self.attempts,
+            "model": self.generator.model_name if self.generator else None,
+            "runtime": self.generator.runtime if self.generator else None,
+            "startup_seconds": self.generator.backend.startup_seconds if self.generator else None,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None,
+            "model_memory_mb": round(self.rss_after_mb - self.rss_before_mb, 1) if self.rss_after_mb is not None else None,
+            "rss_mb": round(get_rss_mb(), 1),
+            "error": self.error
+        }
+
+
+# Shared by every request in this process
+model_registry = ModelRegistry()
@@ -0,0 +1,209 @@
+"""Streaming OCR of PDF pages on the shared process pool.
+
+Each task rasterizes and recognises a single page inside a worker process,
+so only the page number goes in and the text comes back; page images never
+reach this process. At most OCR_WINDOW pages are in flight at once and a
+new one is submitted as each finishes (in page order), so memory stays
+bounded by the window however long the document is.
+
+Pages are rendered in-process by MuPDF as grayscale pixmaps whose raw
+samples become the OCR input directly - no poppler subprocess, no JPEG
+encode/decode, no temp files. OCR_RASTERIZER=pdf2image switches back to
+poppler's pdftoppm. Recognition goes through the engine from
+app.services.ocr_engine, kept alive per worker. Compare rasterizers, or the
+OCR engines on generated scanned pages:
+
+    python -m app.services.ocr --benchmark --pages 20
+    python -m app.services.ocr --benchmark-engines --pages 10
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Tuple
+from concurrent.futures import Future
+from app.services.ocr_engine import ENGINES, OCR_ENGINE, engine_name, get_engine
+from app.services.pdf_text import load_pymupdf, make_sample_pdf, open_pdf
+from app.services.worker_pool import PROCESS_WORKERS, submit_to_process
+
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = "eng"
+OCR_RASTERIZER = os.getenv("OCR_RASTERIZER", "pymupdf")
+# OCR output shorter than this counts as no text
+OCR_MIN_CHARS = 20
+# Pages submitted but not yet collected; each holds at most one page image
+OCR_WINDOW = max(1, int(os.getenv("OCR_WINDOW", str(PROCESS_WORKERS * 2))))
+
+
+def render_page_pymupdf(path: str, page_num: int, dpi: int = OCR_DPI):
+    """Grayscale PIL image of one 0-based page, rendered by MuPDF in this process"""
+    from PIL import Image
+
+    with open_pdf(path) as doc:
+        pixmap = doc[page_num].get_pixmap(dpi=dpi, colorspace=load_pymupdf().csGRAY, alpha=False)
+    # The image is built over the raw 8-bit samples, rows `stride` bytes apart
+    return Image.frombuffer("L", (pixmap.width, pixmap.height), pixmap.samples, "raw", "L", pixmap.stride, 1)
+
+
+def render_page_pdf2image(path: str, page_num: int, dpi: int = OCR_DPI):
+    """PIL image of one 0-based page via poppler's pdftoppm"""
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(path, dpi=dpi, fmt="jpeg", first_page=page_num + 1, last_page=page_num + 1)
+    return images[0] if images else None
+
+
+RASTERIZERS: Dict[str, Callable] = {
+    "pymupdf": render_page_pymupdf,
+    "pdf2image": render_page_pdf2image
+}
+
+
+def ocr_page(path: str, page_num: int, dpi: int = OCR_DPI, lang: str = OCR_LANG, rasterizer: str = OCR_RASTERIZER, engine: str = OCR_ENGINE) -> str:
+    """Text of one 0-based page - runs in a worker process"""
+    image = RASTERIZERS[rasterizer](path, page_num, dpi)
+    if image is None:
+        return ""
+    text = get_engine(lang, engine).recognize(image, dpi)
+    return text if text and len(text.strip()) > OCR_MIN_CHARS else ""
+
+
+def ocr_pages(path: str, page_numbers: List[int], dpi: int = OCR_DPI, lang: str = OCR_LANG, window: int = OCR_WINDOW) -> Dict[int, str]:
+    """OCR text of the given 0-based pages; pages that fail come back empty"""
+    if OCR_RASTERIZER not in RASTERIZERS:
+        raise ValueError(f"Unknown OCR_RASTERIZER {OCR_RASTERIZER!r} (use one of {', '.join(RASTERIZERS)})")
+    # Fail fast (once) when the OCR stack is missing, not once per page
+    engine = engine_name()
+    if engine == "pytesseract":
+        import pytesseract  # noqa: F401
+    if OCR_RASTERIZER == "pdf2image":
+        import pdf2image  # noqa: F401
+    print(f"   🔤 OCR engine: {engine}, {OCR_RASTERIZER} at {dpi} dpi")
+
+    results: Dict[int, str] = {}
+    start = time.perf_counter()
+    total = len(page_numbers)
+
+    def collect(page_num: int, run):
+        try:
+            text = run()
+        except Exception as e:
+            print(f"   ❌ OCR Page {page_num + 1}: Error - {e}")
+            text = ""
+        results[page_num] = text
+        print(f"   📄 OCR {len(results)}/{total} (page {page_num + 1}): " + (f"✅ {len(text)} chars" if text else "⚠️  no text"))
+
+    def submit(page_num: int) -> Future:
+        return submit_to_process(ocr_page, path, page_num, dpi, lang, OCR_RASTERIZER, engine)
+
+    if PROCESS_WORKERS <= 1:
+        # Nothing to overlap with - one page image at a time, in this process
+        for page_num in page_numbers:
+            collect(page_num, lambda: ocr_page(path, page_num, dpi, lang, OCR_RASTERIZER, engine))
+    else:
+        pending: Deque[Tuple[int, Future]] = deque()
+        queue = iter(page_numbers)
+        for page_num in queue:
+            pending.append((page_num, submit(page_num)))
+            if len(pending) >= window:
+                break
+        while pending:
+            page_num, future = pending.popleft()
+            collect(page_num, future.result)
+            next_page = next(queue, None)
+            if next_page is not None:
+                pending.append((next_page, submit(next_page)))
+
+    elapsed = time.perf_counter() - start
+    print(f"   ⏱️  OCR: {total} page(s) in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.2f} pages/s)")
+    return results
+
+
+def benchmark(pages: int, dpi: int):
+    """Rasterization alone: MuPDF pixmaps vs pdftoppm (per page and whole document)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sample.pdf")
+        make_sample_pdf(path, pages)
+        print(f"📄 {pages} generated pages at {dpi} dpi")
+
+        def whole_document():
+            from pdf2image import convert_from_path
+            return convert_from_path(path, dpi=dpi, fmt="jpeg")
+
+        # The first run that works is the baseline for the speedup column
+        runs = {
+            "pdf2image-document": whole_document,
+            "pdf2image": lambda: [render_page_pdf2image(path, page, dpi) for page in range(pages)],
+            "pymupdf": lambda: [render_page_pymupdf(path, page, dpi) for page in range(pages)]
+        }
+        baseline = None
+        for name, run in runs.items():
+            start = time.perf_counter()
+            try:
+                images = run()
+            except Exception as e:
+                print(f"   {name:19s} skipped ({e})")
+                continue
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            size = images[0].size if images else (0, 0)
+            print(f"   {name:19s} {elapsed * 1000 / pages:8.1f} ms/page  {pages / elapsed:7.2f} pages/s  "
+                  f"{size[0]}x{size[1]} {images[0].mode if images else ''}  x{baseline / elapsed:.2f}")
+
+
+def make_scanned_pdf(path: str, pages: int, dpi: int = 200):
+    """An image-only PDF: generated text pages rendered to grayscale and re-embedded"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.pdf")
+        make_sample_pdf(source, pages)
+        pymupdf = load_pymupdf()
+        scanned = pymupdf.open()
+        with open_pdf(source) as doc:
+            for page in doc:
+                pixmap = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY, alpha=False)
+                scanned.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=pixmap)
+        scanned.save(path)
+        scanned.close()
+
+
+def benchmark_engines(pages: int, dpi: int, lang: str = OCR_LANG):
+    """Recognition alone, per engine, on pre-rendered scanned pages"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scanned.pdf")
+        make_scanned_pdf(path, pages)
+        images = [render_page_pymupdf(path, page, dpi) for page in range(pages)]
+        print(f"📄 {pages} generated scanned pages at {dpi} dpi")
+
+        baseline = None
+        for name, engine_class in ENGINES.items():
+            try:
+                start = time.perf_counter()
+                engine = engine_class(lang)
+                setup = time.perf_counter() - start
+                start = time.perf_counter()
+                chars = sum(len(engine.recognize(image, dpi).strip()) for image in images)
+                elapsed = time.perf_counter() - start
+                engine.close()
+            except Exception as e:
+                print(f"   {name:12s} skipped ({e})")
+                continue
+            baseline = baseline or elapsed
+            print(f"   {name:12s} setup {setup * 1000:7.1f} ms  {elapsed * 1000 / pages:8.1f} ms/page  "
+                  f"{pages / elapsed:6.2f} pages/s  {chars} chars  x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR page rasterization and engines")
+    parser.add_argument("--benchmark", action="store_true", help="compare MuPDF and pdf2image rasterization")
+    parser.add_argument("--benchmark-engines", action="store_true", help="compare the OCR engines on generated scanned pages")
+    parser.add_argument("--pages", type=int, default=20, help="pages in the generated document")
+    parser.add_argument("--dpi", type=int, default=OCR_DPI)
+    args = parser.parse_args()
+
+    if not (args.benchmark or args.benchmark_engines):
+        parser.error("nothing to do (use --benchmark or --benchmark-engines)")
+    if args.benchmark:
+        benchmark(args.pages, args.dpi)
+    if args.benchmark_engines:
+        benchmark_engines(args.pages, args.dpi)
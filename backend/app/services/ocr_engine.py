@@ -0,0 +1,123 @@
+"""OCR engines used by app.services.ocr.
+
+pytesseract runs the `tesseract` CLI once per page: a new process, a temp
+image file, and the language data loaded again every time. TesserocrEngine
+instead keeps one libtesseract API (through the optional `tesserocr`
+package) alive per worker and hands it the page's raw pixels, so the
+language data is loaded once per worker.
+
+OCR_ENGINE=auto (default) uses tesserocr when it is installed and falls back
+to pytesseract otherwise, or when tesserocr can't start (e.g. missing
+language data). OCR_ENGINE=pytesseract or tesserocr picks one explicitly.
+"""
+import importlib.util
+import os
+import threading
+from multiprocessing.util import Finalize
+from typing import Dict, List
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+
+
+class OCREngine:
+    """Turns one page image into text"""
+
+    name: str = "unknown"
+
+    def recognize(self, image, dpi: int) -> str:
+        """Text of a PIL image rendered at `dpi`"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    """The tesseract CLI, one subprocess per page"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.lang = lang
+
+    def recognize(self, image, dpi: int) -> str:
+        return self._pytesseract.image_to_string(image, lang=self.lang, config=f"--dpi {dpi}")
+
+
+class TesserocrEngine(OCREngine):
+    """A persistent libtesseract API, fed raw pixels"""
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str):
+        import tesserocr
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def recognize(self, image, dpi: int) -> str:
+        if image.mode == "L":
+            # 8-bit grayscale rows, no encoding in between
+            self.api.SetImageBytes(image.tobytes(), image.width, image.height, 1, image.width)
+        else:
+            self.api.SetImage(image)
+        self.api.SetSourceResolution(dpi)
+        return self.api.GetUTF8Text()
+
+    def close(self):
+        self.api.End()
+
+
+ENGINES = {
+    "pytesseract": PytesseractEngine,
+    "tesserocr": TesserocrEngine
+}
+
+
+def engine_name(requested: str = OCR_ENGINE) -> str:
+    """The engine `requested` resolves to here (without importing it)"""
+    if requested == "auto":
+        return "tesserocr" if importlib.util.find_spec("tesserocr") else "pytesseract"
+    if requested not in ENGINES:
+        raise ValueError(f"Unknown OCR_ENGINE {requested!r} (use auto, {', '.join(ENGINES)})")
+    return requested
+
+
+# Engines are not thread-safe; each worker process (or pool thread) gets its own
+_local = threading.local()
+# Every engine this process created, whichever thread owns it, for close_engines
+_created: List[OCREngine] = []
+_created_lock = threading.Lock()
+
+
+def get_engine(lang: str, requested: str = OCR_ENGINE) -> OCREngine:
+    """This worker's engine for `lang`, created on first use and kept"""
+    engines: Dict[str, OCREngine] = _local.__dict__.setdefault("engines", {})
+    name = engine_name(requested)
+    key = f"{name}:{lang}"
+    if key not in engines:
+        try:
+            engines[key] = ENGINES[name](lang)
+        except Exception as e:
+            if name == "pytesseract":
+                raise
+            print(f"⚠️  {name} unavailable ({e}), falling back to pytesseract")
+            engines[key] = PytesseractEngine(lang)
+        with _created_lock:
+            if not _created:
+                # Runs when a pool worker exits, and at interpreter exit here
+                Finalize(None, close_engines, exitpriority=10)
+            _created.append(engines[key])
+    return engines[key]
+
+
+def close_engines():
+    """Release every engine this process created (at exit)"""
+    with _created_lock:
+        engines = _created[:]
+        _created.clear()
+    for engine in engines:
+        try:
+            engine.close()
+        except Exception as e:
+            print(f"⚠️  Closing {engine.name} engine failed: {e}")
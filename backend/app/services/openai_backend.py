@@ -0,0 +1,333 @@
+"""Inference over an OpenAI-compatible chat-completions server.
+
+Select with INFERENCE_BACKEND=openai and point INFERENCE_URL at e.g. a
+llama.cpp server or vLLM (default http://127.0.0.1:8080/v1).
+
+A canned stub server and a smoke test are included for local testing:
+
+    python -m app.services.openai_backend --stub --port 8080
+    python -m app.services.openai_backend --smoke http://127.0.0.1:8080/v1
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+import httpx
+from app.services.inference_backend import InferenceBackend, MAX_NEW_TOKENS, token_budget
+from app.services.slide_parser import slides_json_schema
+from app.services.instrumentation import record
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_STREAM_DONE = object()
+
+
+class OpenAIBackend(InferenceBackend):
+    """Pooled async HTTP client for /chat/completions.
+
+    One httpx.AsyncClient (keep-alive pool) lives on a private event loop
+    thread, so synchronous callers on any worker thread share connections.
+    A semaphore caps in-flight requests to the server; transport errors and
+    429/5xx responses are retried with exponential backoff.
+    """
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None, timeout: float = 120.0,
+                 connect_timeout: float = 5.0, max_connections: int = 8, max_concurrency: int = 4, max_retries: int = 2,
+                 context_window: int = 8192):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model
+        self.max_retries = max_retries
+        self.context_window = context_window
+        self.runtime = {
+            "backend": "openai",
+            "url": self.base_url,
+            "max_concurrency": max_concurrency
+        }
+
+        self.requests_total = 0
+        self.retries_total = 0
+        self.failures_total = 0
+        self.in_flight = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="openai-backend", daemon=True)
+        self._thread.start()
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+        async def setup():
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+            self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._run(setup())
+
+    @classmethod
+    def from_env(cls) -> "OpenAIBackend":
+        return cls(
+            base_url=os.getenv("INFERENCE_URL", "http://127.0.0.1:8080/v1"),
+            model=os.getenv("INFERENCE_MODEL", "Qwen/Qwen2.5-3B-Instruct"),
+            api_key=os.getenv("INFERENCE_API_KEY"),
+            timeout=float(os.getenv("INFERENCE_TIMEOUT", "120")),
+            connect_timeout=float(os.getenv("INFERENCE_CONNECT_TIMEOUT", "5")),
+            max_connections=int(os.getenv("INFERENCE_MAX_CONNECTIONS", "8")),
+            max_concurrency=int(os.getenv("INFERENCE_MAX_CONCURRENCY", "4")),
+            max_retries=int(os.getenv("INFERENCE_MAX_RETRIES", "2")),
+            context_window=int(os.getenv("INFERENCE_CONTEXT_TOKENS", "8192"))
+        )
+
+    def _run(self, coro):
+        """Run a coroutine on the client loop and wait for it from this thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _payload(self, prompt: Dict, temperature: float, max_tokens: int, num_slides: Optional[int] = None, stream: bool = False, structured: bool = False) -> Dict:
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": prompt["system"]},
+                # Static part first, so servers with prompt caching reuse it
+                {"role": "user", "content": prompt["static"] + prompt["variable"]}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+        if num_slides and structured:
+            # Server-side grammar (llama.cpp, vLLM) - the schema fixes the slide count
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "slides", "strict": True, "schema": slides_json_schema(num_slides)}
+            }
+        elif num_slides:
+            # Server-side equivalent of SlideCountCriteria
+            payload["stop"] = [f"Slide {num_slides + 1}"]
+        return payload
+
+    async def _backoff(self, attempt: int, response: Optional[httpx.Response] = None):
+        self.retries_total += 1
+        delay = 0.5 * (2 ** attempt)
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            delay = float(response.headers["Retry-After"])
+        await asyncio.sleep(min(delay, 30))
+
+    async def _complete(self, payload: Dict) -> Tuple[str, int]:
+        """One non-streaming completion with retries"""
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests_total += 1
+            started = time.perf_counter()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        response = await self._client.post("/chat/completions", json=payload)
+                    except httpx.TransportError:
+                        if attempt == self.max_retries:
+                            raise
+                        await self._backoff(attempt)
+                        continue
+
+                    if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                        await self._backoff(attempt, response)
+                        continue
+
+                    response.raise_for_status()
+                    data = response.json()
+                    text = data["choices"][0]["message"]["content"] or ""
+                    usage = data.get("usage", {})
+                    # Server-side prefill and decode can't be told apart here
+                    record("inference", time.perf_counter() - started,
+                           input_tokens=usage.get("prompt_tokens", 0), output_tokens=usage.get("completion_tokens", 0))
+                    return text.strip(), usage.get("completion_tokens", 0)
+            except Exception:
+                self.failures_total += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    def warmup(self, prompts: List[Dict], structured: bool = False):
+        """Open pooled connections and make sure the server answers"""
+        hello = {"system": "You are a helpful assistant.", "static": "", "variable": "Say hello."}
+        self._run(self._complete(self._payload(hello, 0.0, 1)))
+
+    def generate(self, prompts: List[Dict], temperature: float, slide_targets: Optional[List[int]] = None, max_new_tokens: Optional[int] = None, structured: bool = False) -> Tuple[List[str], int]:
+        """Send every prompt concurrently (bounded by the semaphore)"""
+        targets = slide_targets or [None] * len(prompts)
+
+        async def run_all():
+            return await asyncio.gather(*[
+                self._complete(self._payload(
+                    prompt, temperature,
+                    max_new_tokens or (token_budget(target) if target else MAX_NEW_TOKENS),
+                    num_slides=target, structured=structured
+                ))
+                for prompt, target in zip(prompts, targets)
+            ])
+
+        results = self._run(run_all())
+        return [text for text, _ in results], sum(tokens for _, tokens in results)
+
+    def stream(self, prompt: Dict, temperature: float, num_slides: int, structured: bool = False) -> Iterator[str]:
+        """Yield content deltas from a streamed completion"""
+        chunks = queue.Queue()
+        payload = self._payload(prompt, temperature, token_budget(num_slides), num_slides=num_slides, stream=True, structured=structured)
+
+        async def pump():
+            async with self._semaphore:
+                self.in_flight += 1
+                self.requests_total += 1
+                started = time.perf_counter()
+                first_at = None
+                deltas = 0
+                try:
+                    async with self._client.stream("POST", "/chat/completions", json=payload) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                            if delta:
+                                first_at = first_at or time.perf_counter()
+                                deltas += 1
+                                chunks.put(delta)
+                    # Time to first delta ~ prefill; one delta is ~one token
+                    ended = time.perf_counter()
+                    record("prefill", (first_at or ended) - started)
+                    record("decode", ended - (first_at or ended), output_tokens=deltas)
+                except Exception as e:
+                    self.failures_total += 1
+                    chunks.put(e)
+                finally:
+                    self.in_flight -= 1
+                    chunks.put(_STREAM_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item = chunks.get()
+                if item is _STREAM_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early - drop the HTTP stream so the server stops decoding
+            future.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "openai",
+            "url": self.base_url,
+            "requests": self.requests_total,
+            "retries": self.retries_total,
+            "failures": self.failures_total,
+            "in_flight": self.in_flight
+        }
+
+    def close(self):
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def run_stub_server(port: int):
+    """Minimal OpenAI-compatible server returning canned slides"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    def canned_slides(messages: List[Dict], structured: bool) -> str:
+        match = re.search(r"Create (\d+)", messages[-1]["content"])
+        count = int(match.group(1)) if match else 3
+        if structured:
+            return json.dumps({"slides": [
+                {"title": f"Stub Topic {i}", "content": [f"{n} stub point for slide {i}" for n in ("First", "Second", "Third")]}
+                for i in range(1, count + 1)
+            ]})
+        return "\n\n".join(
+            f"Slide {i}\nTitle: Stub Topic {i}\n- First stub point for slide {i}\n"
+            f"- Second stub point for slide {i}\n- Third stub point for slide {i}"
+            for i in range(1, count + 1)
+        )
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self._json({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            text = canned_slides(body["messages"], "response_format" in body)
+            for stop in body.get("stop") or []:
+                text = text.split(stop)[0]
+
+            if not body.get("stream"):
+                self._json({
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"completion_tokens": len(text.split())}
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for word in re.findall(r"\S+\s*", text):
+                chunk = {"choices": [{"index": 0, "delta": {"content": word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(0.005)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def _json(self, data: Dict):
+            payload = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    print(f"🧪 Stub chat-completions server on http://127.0.0.1:{port}/v1")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+def smoke_test(base_url: str):
+    """Generate through AIGenerator against a running server"""
+    from app.services.ai_generator import AIGenerator
+
+    backend = OpenAIBackend(base_url=base_url, model=os.getenv("INFERENCE_MODEL", "stub"))
+    generator = AIGenerator(backend=backend)
+    generator.warmup()
+
+    start = time.perf_counter()
+    results, tokens = generator.generate_slides_from_topics_batch([
+        {"topic": "Photosynthesis", "num_slides": 3},
+        {"topic": "Volcanoes", "num_slides": 2}
+    ])
+    print(f"✅ Batch: {[len(slides) for slides in results]} slides, {tokens} tokens in {time.perf_counter() - start:.2f}s")
+
+    streamed = list(generator.stream_slides_from_topic("Plate tectonics", 2))
+    print(f"✅ Stream: {[slide['title'] for slide in streamed]}")
+    print(f"📊 {backend.stats()}")
+    backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible inference backend tools")
+    parser.add_argument("--stub", action="store_true", help="run a canned local chat-completions server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--smoke", metavar="URL", help="generate slides against a server")
+    args = parser.parse_args()
+
+    if args.stub:
+        run_stub_server(args.port)
+    elif args.smoke:
+        smoke_test(args.smoke)
+    else:
+        parser.print_help()
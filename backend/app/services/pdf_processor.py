@@ -1,123 +1,107 @@
-import PyPDF2
 from typing import List, Dict
 import re
-from pdf2image import convert_from_path
-import pytesseract
-from PIL import Image
 import os
+from app.services.instrumentation import stage
+from app.services.pdf_text import extract_pages
+from app.services.ocr import OCR_DPI, OCR_LANG, OCR_MIN_CHARS, OCR_RASTERIZER, ocr_pages
+from app.services.ocr_engine import engine_name
+
+# Bump when a change alters extracted text, so cached extractions are redone
+EXTRACTOR_VERSION = 4
+# Pages with less embedded text than this are OCRed
+MIN_PAGE_CHARS = 50
+
+# Where each page's text came from
+SOURCE_TEXT = "text"
+SOURCE_OCR = "ocr"
+SOURCE_NONE = "none"
+
+def extraction_settings() -> Dict:
+    """Everything that shapes the extracted text, for cache keys"""
+    return {
+        "extractor_version": EXTRACTOR_VERSION,
+        "min_page_chars": MIN_PAGE_CHARS,
+        "ocr_min_chars": OCR_MIN_CHARS,
+        "ocr_dpi": OCR_DPI,
+        "ocr_lang": OCR_LANG,
+        "ocr_rasterizer": OCR_RASTERIZER,
+        "ocr_engine": engine_name()
+    }
 
 class PDFProcessor:
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
-        self.pdf_reader = None
-        
-        try:
-            with open(pdf_path, 'rb') as file:
-                self.pdf_reader = PyPDF2.PdfReader(file)
-                self.num_pages = len(self.pdf_reader.pages)
-        except Exception as e:
-            print(f"❌ Error opening PDF: {e}")
-            self.num_pages = 0
+        self.num_pages = 0
+        # SOURCE_TEXT / SOURCE_OCR / SOURCE_NONE per page, set by extract_text_by_pages
+        self.page_sources: List[str] = []
     
     def extract_text_by_pages(self) -> List[str]:
-        """Extract text from PDF with OCR fallback for scanned PDFs"""
+        """Extract text from PDF, OCRing only the pages without usable embedded text"""
         
         print(f"\n{'='*60}")
         print(f"📄 PDF EXTRACTION STARTING")
         print(f"📂 File: {self.pdf_path}")
         print(f"{'='*60}")
         
-        pages_text = []
-        
-        if not self.pdf_reader:
-            print("❌ PDF Reader not initialized")
-            return pages_text
+        try:
+            raw_pages, engine = extract_pages(self.pdf_path)
+        except Exception as e:
+            print(f"❌ Error opening PDF: {e}")
+            return []
         
-        print(f"📊 Total pages in PDF: {self.num_pages}")
+        self.num_pages = len(raw_pages)
+        print(f"📊 Total pages in PDF: {self.num_pages} (text via {engine})")
         
         # First try: Regular text extraction
-        pages_with_text = 0
+        pages_text = [text or "" for text in raw_pages]
+        self.page_sources = [SOURCE_TEXT if text.strip() else SOURCE_NONE for text in pages_text]
+        missing = [page_num for page_num, text in enumerate(pages_text) if len(text.strip()) <= MIN_PAGE_CHARS]
         
-        for page_num in range(self.num_pages):
-            try:
-                page = self.pdf_reader.pages[page_num]
-                text = page.extract_text()
-                
-                if text and len(text.strip()) > 50:
-                    pages_text.append(text)
-                    pages_with_text += 1
-                else:
-                    pages_text.append("")
-                    print(f"   ⚠️  Page {page_num + 1}: NO TEXT FOUND (might be image-based PDF)")
-                    
-            except Exception as e:
-                print(f"   ❌ Page {page_num + 1}: Error - {e}")
-                pages_text.append("")
-        
-        print(f"📋 Total pages with text: {pages_with_text}/{self.num_pages}")
-        
-        # If less than 30% of pages have text, it's likely a scanned PDF - use OCR
-        if pages_with_text < (self.num_pages * 0.3):
-            print(f"\n🔍 LOW TEXT EXTRACTION - Attempting OCR...")
-            print(f"{'='*60}")
-            return self._extract_with_ocr()
-        
-        if pages_with_text == 0:
-            print(f"❌ NO TEXT EXTRACTED - This might be a scanned/image-based PDF!")
-            print(f"{'='*60}")
-            print(f"\n🔍 Attempting OCR extraction...")
-            return self._extract_with_ocr()
+        print(f"📋 Total pages with text: {self.num_pages - len(missing)}/{self.num_pages}")
+        
+        if not missing:
+            print(f"{'='*60}\n")
+            return pages_text
+        
+        # Scanned pages (or a whole scanned document): OCR just those and
+        # merge them back in page order
+        print(f"\n🔍 {len(missing)} page(s) without text - attempting OCR...")
+        print(f"{'='*60}")
+        ocr_text = self._extract_with_ocr(missing)
+        
+        for page_num, text in ocr_text.items():
+            # A short text layer (e.g. just a page number) loses to real OCR output
+            if len(text.strip()) > len(pages_text[page_num].strip()):
+                pages_text[page_num] = text
+                self.page_sources[page_num] = SOURCE_OCR
         
+        print(f"📋 Pages by source: " + ", ".join(
+            f"{source} {self.page_sources.count(source)}" for source in (SOURCE_TEXT, SOURCE_OCR, SOURCE_NONE)
+        ))
         print(f"{'='*60}\n")
         return pages_text
     
-    def _extract_with_ocr(self) -> List[str]:
-        """Extract text using OCR for scanned/image PDFs"""
+    def _extract_with_ocr(self, page_numbers: List[int]) -> Dict[int, str]:
+        """OCR text of the given 0-based pages (empty where nothing was recognised)"""
         
+        with stage("ocr") as counts:
+            ocr_text = self._ocr_pages(page_numbers)
+            counts["pages"] = len(page_numbers)
+        return ocr_text
+    
+    def _ocr_pages(self, page_numbers: List[int]) -> Dict[int, str]:
         try:
-            print(f"📸 Converting PDF pages to images...")
-            
-            # Convert PDF to images
-            images = convert_from_path(
-                self.pdf_path,
-                dpi=300,  # High quality
-                fmt='jpeg'
-            )
-            
-            print(f"✅ Converted {len(images)} pages to images")
-            print(f"🔤 Performing OCR on each page...\n")
+            print(f"🔤 Performing OCR on {len(page_numbers)} page(s)...\n")
+            ocr_text = ocr_pages(self.pdf_path, page_numbers)
             
-            pages_text = []
-            
-            for i, image in enumerate(images, 1):
-                print(f"   📄 OCR Page {i}/{len(images)}...", end=" ")
-                
-                try:
-                    # Perform OCR
-                    text = pytesseract.image_to_string(image, lang='eng')
-                    
-                    if text and len(text.strip()) > 20:
-                        pages_text.append(text)
-                        print(f"✅ Extracted {len(text)} chars")
-                    else:
-                        pages_text.append("")
-                        print(f"⚠️  No text found")
-                        
-                except Exception as e:
-                    print(f"❌ Error: {e}")
-                    pages_text.append("")
-            
-            total_chars = sum(len(text) for text in pages_text)
+            total_chars = sum(len(text) for text in ocr_text.values())
             print(f"\n✅ OCR Complete!")
             print(f"📊 Total characters extracted: {total_chars}")
-            print(f"{'='*60}\n")
-            
-            return pages_text
+            return ocr_text
             
         except Exception as e:
             print(f"❌ OCR Failed: {e}")
-            print(f"{'='*60}\n")
-            return [""] * self.num_pages
+            return {page_num: "" for page_num in page_numbers}
     
     def detect_chapters(self, pages_text: List[str]) -> List[Dict]:
         """Detect chapters from extracted text"""
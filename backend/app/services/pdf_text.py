@@ -0,0 +1,150 @@
+"""Text-layer extraction for PDFs.
+
+PyMuPDF (MuPDF, in C) is the primary engine. Large documents are split
+into page ranges that are extracted in parallel on the shared process
+pool; each worker opens the file itself, so only page text crosses the
+process boundary. PyPDF2 remains as the fallback when PyMuPDF is missing
+or can't open the file.
+
+Compare the engines on a generated document:
+
+    python -m app.services.pdf_text --benchmark --pages 300
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List, Tuple
+from app.services.worker_pool import PROCESS_WORKERS, submit_to_process
+
+# Below this many pages the process round-trip costs more than it saves
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+
+
+def load_pymupdf():
+    """The PyMuPDF module (imported as `fitz` before 1.24)"""
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf
+    return pymupdf
+
+
+def open_pdf(path: str):
+    return load_pymupdf().open(path)
+
+
+def page_count(path: str) -> int:
+    try:
+        with open_pdf(path) as doc:
+            return doc.page_count
+    except Exception:
+        import PyPDF2
+        with open(path, "rb") as f:
+            return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_range(path: str, start: int, end: int) -> List[str]:
+    """Text of pages [start, end) - runs in a worker process"""
+    with open_pdf(path) as doc:
+        return [doc[page].get_text("text") for page in range(start, end)]
+
+
+def page_ranges(num_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """Contiguous ranges, about two per worker so a slow range doesn't stall the rest"""
+    size = max(1, -(-num_pages // (workers * 2)))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+
+def extract_pages_pymupdf(path: str, parallel: bool = True) -> List[str]:
+    """Per-page text in page order"""
+    with open_pdf(path) as doc:
+        num_pages = doc.page_count
+        if not parallel or PROCESS_WORKERS <= 1 or num_pages < PARALLEL_MIN_PAGES:
+            return [page.get_text("text") for page in doc]
+
+    futures = [submit_to_process(_extract_range, path, start, end) for start, end in page_ranges(num_pages, PROCESS_WORKERS)]
+    pages: List[str] = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def extract_pages_pypdf2(path: str) -> List[str]:
+    """Per-page text with the pure-Python reader (fallback)"""
+    import PyPDF2
+
+    pages = []
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for page_num, page in enumerate(reader.pages):
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception as e:
+                print(f"   ❌ Page {page_num + 1}: Error - {e}")
+                pages.append("")
+    return pages
+
+
+def extract_pages(path: str) -> Tuple[List[str], str]:
+    """(per-page text, engine used)"""
+    try:
+        return extract_pages_pymupdf(path), "pymupdf"
+    except Exception as e:
+        print(f"⚠️  PyMuPDF extraction failed ({e}), falling back to PyPDF2")
+    return extract_pages_pypdf2(path), "pypdf2"
+
+
+def make_sample_pdf(path: str, pages: int):
+    """A text PDF with `pages` pages of textbook-like paragraphs"""
+    paragraph = (
+        "Photosynthesis converts light energy into chemical energy stored in glucose. "
+        "Chlorophyll in the thylakoid membranes absorbs mostly blue and red light, "
+        "and the Calvin cycle fixes carbon dioxide in the stroma. "
+    )
+    doc = load_pymupdf().open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = f"Chapter {number // 20 + 1}: Section {number + 1}\n\n" + (paragraph * 3 + "\n\n") * 6
+        page.insert_textbox(page.rect + (54, 54, -54, -54), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def benchmark(pages: int, runs: int = 3):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sample.pdf")
+        make_sample_pdf(path, pages)
+        print(f"📄 {pages} generated pages, {PROCESS_WORKERS} worker process(es)")
+
+        engines = {
+            "pypdf2": lambda: extract_pages_pypdf2(path),
+            "pymupdf": lambda: extract_pages_pymupdf(path, parallel=False),
+            "pymupdf-parallel": lambda: extract_pages_pymupdf(path, parallel=True)
+        }
+        # Start the worker processes before timing
+        submit_to_process(page_count, path).result()
+
+        baseline = None
+        for name, extract in engines.items():
+            best = float("inf")
+            chars = 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                result = extract()
+                best = min(best, time.perf_counter() - start)
+                chars = sum(len(text) for text in result)
+            baseline = baseline or best
+            print(f"   {name:17s} {best * 1000:8.1f} ms  {pages / best:8.1f} pages/s  {chars} chars  x{baseline / best:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF text-layer extraction")
+    parser.add_argument("--benchmark", action="store_true", help="compare PyPDF2, PyMuPDF and parallel PyMuPDF")
+    parser.add_argument("--pages", type=int, default=300, help="pages in the generated document")
+    parser.add_argument("--runs", type=int, default=3, help="best of this many runs per engine")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.error("nothing to do (use --benchmark)")
+    benchmark(args.pages, args.runs)
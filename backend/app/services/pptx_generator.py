@@ -5,13 +5,18 @@ from pptx.enum.shapes import MSO_SHAPE
 from pptx.dml.color import RGBColor
 from typing import List, Dict
 
-# Try to import ImageGenerator, but don't fail if it's not available
-try:
-    from app.services.image_generator import ImageGenerator
-    IMAGE_GENERATION_AVAILABLE = True
-except ImportError:
-    IMAGE_GENERATION_AVAILABLE = False
-    ImageGenerator = None
+
+def load_image_generator():
+    """ImageGenerator class, or None if it's not available.
+
+    Imported on first use: it pulls in the diffusion model stack, which
+    plain text decks never need.
+    """
+    try:
+        from app.services.image_generator import ImageGenerator
+    except ImportError:
+        return None
+    return ImageGenerator
 
 
 class PPTXGenerator:
@@ -21,7 +26,8 @@ class PPTXGenerator:
         self.prs.slide_height = Inches(7.5)
 
         # Initialize image generator if requested AND available
-        self.use_images = use_images and IMAGE_GENERATION_AVAILABLE
+        ImageGenerator = load_image_generator() if use_images else None
+        self.use_images = ImageGenerator is not None
         if self.use_images:
             try:
                 self.image_generator = ImageGenerator()
@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Dict, List, Tuple
+import torch
+from transformers import DynamicCache
+
+
+class PrefixCache:
+    """past_key_values for static prompt prefixes, computed once per prefix.
+
+    Requests then prefill only their variable tail. For a batch, rows are
+    laid out as [prefix][padding][tail] with the padding masked out, so the
+    shared prefix KV stays valid for every row and position ids (derived
+    from the attention mask) remain contiguous.
+    """
+
+    def __init__(self, model, tokenizer, max_entries: int = 8):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[torch.Tensor, tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prefix_text: str) -> Tuple[torch.Tensor, tuple]:
+        """Token ids and legacy-format KV tensors for a prefix"""
+        with self._lock:
+            entry = self._entries.get(prefix_text)
+            if entry is not None:
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            prefix_ids = self.tokenizer(prefix_text, return_tensors="pt")["input_ids"]
+
+            start = time.perf_counter()
+            with torch.no_grad():
+                outputs = self.model(prefix_ids, past_key_values=DynamicCache(), use_cache=True)
+            print(f"🧠 Cached prompt prefix: {prefix_ids.shape[1]} tokens in {time.perf_counter() - start:.1f}s")
+
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+
+            entry = (prefix_ids, outputs.past_key_values.to_legacy_cache())
+            self._entries[prefix_text] = entry
+            return entry
+
+    def build_inputs(self, prefix_text: str, tails: List[str]) -> Dict:
+        """generate() kwargs for prompts that all start with prefix_text"""
+        prefix_ids, legacy_kv = self.get(prefix_text)
+        prefix_len = prefix_ids.shape[1]
+        batch_size = len(tails)
+
+        tail_ids = [
+            self.tokenizer(tail, add_special_tokens=False)["input_ids"]
+            for tail in tails
+        ]
+        tail_len = max(len(ids) for ids in tail_ids)
+        pad_id = self.tokenizer.pad_token_id
+
+        input_ids = torch.full((batch_size, prefix_len + tail_len), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((batch_size, prefix_len + tail_len), dtype=torch.long)
+        for row, ids in enumerate(tail_ids):
+            input_ids[row, :prefix_len] = prefix_ids[0]
+            attention_mask[row, :prefix_len] = 1
+            if ids:
+                input_ids[row, -len(ids):] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, -len(ids):] = 1
+
+        # generate() extends the cache in place, so every call gets its own copy
+        past_key_values = DynamicCache.from_legacy_cache(tuple(
+            (key.repeat(batch_size, 1, 1, 1), value.repeat(batch_size, 1, 1, 1))
+            for key, value in legacy_kv
+        ))
+
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "past_key_values": past_key_values
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "prefixes": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
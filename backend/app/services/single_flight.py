@@ -0,0 +1,82 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.instrumentation import stage
+
+# report(stage, **info), as passed to the job handlers
+Report = Callable[..., None]
+
+
+class Flight:
+    """One shared task and the progress callbacks of everyone awaiting it"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.reporters: List[Report] = []
+        self.last: Optional[Tuple[str, Dict]] = None
+
+    def report(self, step: str, **info):
+        self.last = (step, info)
+        for reporter in list(self.reporters):
+            reporter(step, **info)
+
+
+class SingleFlight:
+    """Coalesces identical in-flight work.
+
+    The first caller for a key starts the work as its own task; callers
+    arriving with the same key before it finishes await that task instead
+    of starting another. The work reports progress to every caller still
+    waiting (a late joiner first gets the latest stage). Each caller gets a
+    private deep copy of the result, so per-request post-processing can't
+    leak between them. The task is shielded, so a leader whose request is
+    cancelled doesn't cancel the work its followers are waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, Flight] = {}
+        self.leaders_total = 0
+        self.followers_total = 0
+
+    async def run(self, key: str, work: Callable[[Report], Awaitable[Any]], report: Optional[Report] = None) -> Any:
+        """Result of `work(report)`, run once for every concurrent caller of `key`"""
+        flight = self._in_flight.get(key)
+        leader = flight is None
+        if leader:
+            self.leaders_total += 1
+            flight = self._in_flight[key] = Flight()
+            flight.task = asyncio.create_task(work(flight.report))
+            flight.task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.followers_total += 1
+            print(f"🤝 Joined in-flight {self.name} request ({len(self._in_flight)} in flight)")
+
+        if report is not None:
+            if flight.last is not None:
+                report(flight.last[0], **flight.last[1])
+            flight.reporters.append(report)
+        try:
+            if leader:
+                result = await asyncio.shield(flight.task)
+            else:
+                # The leader's trace holds the actual stages
+                with stage("coalesced_wait"):
+                    result = await asyncio.shield(flight.task)
+        finally:
+            if report is not None:
+                flight.reporters.remove(report)
+
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders_total,
+            "coalesced": self.followers_total
+        }
+
+
+# Topic slides and PDF slide decks currently being generated
+topic_flights = SingleFlight("topic")
+pdf_flights = SingleFlight("pdf")
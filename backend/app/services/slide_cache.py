@@ -0,0 +1,193 @@
+"""Content-addressed cache of generated slide lists.
+
+Two tiers: an in-memory LRU in front of JSON files under SLIDE_CACHE_DIR.
+Keys are a sha256 over everything that shapes the model output (model id,
+normalized prompt, slide count, custom prompt, sampling parameters), so
+re-running the same topic or re-uploading the same PDF with another
+template skips generation entirely.
+
+Entries expire after SLIDE_CACHE_TTL seconds; the disk tier is trimmed
+oldest-first once it grows past SLIDE_CACHE_MAX_MB.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.utils.helpers import ensure_dir
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so cosmetic differences map to the same key"""
+    return " ".join((text or "").split())
+
+
+def cache_key(**parts) -> str:
+    """Stable hash of the generation inputs"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SlideCache:
+    """In-memory LRU backed by one JSON file per entry"""
+
+    # Name of the cached value inside each file
+    record_field = "slides"
+
+    def __init__(self, cache_dir: Optional[str] = "model_cache/slides", memory_entries: int = 256,
+                 ttl_seconds: float = 7 * 24 * 3600, max_disk_mb: float = 256, enabled: bool = True):
+        self.enabled = enabled
+        self.cache_dir = cache_dir
+        self.memory_entries = max(0, memory_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+
+        # key -> (created timestamp, serialized slides)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk_bytes = 0
+
+        if self.enabled and self.cache_dir:
+            ensure_dir(self.cache_dir)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    @classmethod
+    def from_env(cls) -> "SlideCache":
+        return cls(
+            cache_dir=os.getenv("SLIDE_CACHE_DIR", "model_cache/slides") or None,
+            memory_entries=int(os.getenv("SLIDE_CACHE_MEMORY_ENTRIES", "256")),
+            ttl_seconds=float(os.getenv("SLIDE_CACHE_TTL", str(7 * 24 * 3600))),
+            max_disk_mb=float(os.getenv("SLIDE_CACHE_MAX_MB", "256")),
+            enabled=os.getenv("SLIDE_CACHE", "1") == "1"
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created > self.ttl_seconds
+
+    def _remember(self, key: str, created: float, payload: str):
+        """Insert into the memory tier, dropping least recently used entries"""
+        if not self.memory_entries:
+            return
+        self._memory[key] = (created, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Fresh copy of the cached slides, or None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(entry[1])
+            if entry:
+                del self._memory[key]
+
+            if self.cache_dir and os.path.exists(self._path(key)):
+                try:
+                    with open(self._path(key), "r", encoding="utf-8") as f:
+                        record = json.load(f)
+                    if not self._expired(record["created"]):
+                        payload = json.dumps(record[self.record_field])
+                        self._remember(key, record["created"], payload)
+                        self.disk_hits += 1
+                        return json.loads(payload)
+                    self._remove_file(self._path(key))
+                except (OSError, ValueError, KeyError):
+                    # Corrupt or half-written file - treat as a miss
+                    self._remove_file(self._path(key))
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, slides: List[Dict]):
+        """Store slides in both tiers"""
+        if not self.enabled:
+            return
+
+        created = time.time()
+        payload = json.dumps(slides)
+        with self._lock:
+            self._remember(key, created, payload)
+
+            if not self.cache_dir:
+                return
+            try:
+                path = self._path(key)
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(json.dumps({"created": created, self.record_field: slides}))
+                os.replace(tmp_path, path)
+                self._disk_bytes += os.path.getsize(path) - previous
+            except OSError as e:
+                print(f"⚠️  Slide cache write failed: {e}")
+                return
+
+            if self._disk_bytes > self.max_disk_bytes:
+                self._trim_disk()
+
+    def _disk_entries(self):
+        """(mtime, path, size) for every stored entry"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _remove_file(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._disk_bytes -= size
+            self.evictions += 1
+        except OSError:
+            pass
+
+    def _trim_disk(self):
+        """Drop expired entries, then oldest ones until under the size limit"""
+        for mtime, path, _ in sorted(self._disk_entries()):
+            if self._disk_bytes <= self.max_disk_bytes and not self._expired(mtime):
+                break
+            self._remove_file(path)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.enabled and self.cache_dir:
+                for _, path, _ in self._disk_entries():
+                    self._remove_file(path)
+
+    def stats(self) -> Dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_mb": round(self._disk_bytes / (1024 * 1024), 2),
+            "evictions": self.evictions
+        }
+
+
+# Shared by every generator in this process
+slide_cache = SlideCache.from_env()
@@ -0,0 +1,221 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Headers must start a line (optionally markdown-decorated) so a bullet that
+# mentions "slide 2" doesn't split a block
+SLIDE_HEADER = re.compile(r'^[ \t#*]*Slide\s+(\d+)', re.IGNORECASE | re.MULTILINE)
+BLOCK_END = re.compile(r'\n[ \t]*\n\s*$')
+
+# Bounds shared by the regex parser and the constrained JSON grammar
+MIN_BULLET_CHARS = 16
+MAX_BULLET_CHARS = 140
+MAX_TITLE_CHARS = 80
+MIN_BULLETS = 3
+MAX_BULLETS = 5
+
+
+def slides_json_schema(num_slides: int) -> Dict:
+    """JSON Schema of the constrained output: {"slides": [{title, content[]}]}"""
+    return {
+        "type": "object",
+        "properties": {
+            "slides": {
+                "type": "array",
+                "minItems": num_slides,
+                "maxItems": num_slides,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "minLength": 1, "maxLength": MAX_TITLE_CHARS},
+                        "content": {
+                            "type": "array",
+                            "minItems": MIN_BULLETS,
+                            "maxItems": MAX_BULLETS,
+                            "items": {"type": "string", "minLength": MIN_BULLET_CHARS, "maxLength": MAX_BULLET_CHARS}
+                        }
+                    },
+                    "required": ["title", "content"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["slides"],
+        "additionalProperties": False
+    }
+
+
+def _clean_bullet(content: str) -> Optional[str]:
+    """Trim one bullet, or None if it is too short to be worth a line"""
+    content = content.strip()
+    if len(content) > MAX_BULLET_CHARS:
+        content = content[:MAX_BULLET_CHARS - 3] + "..."
+    if len(content) < MIN_BULLET_CHARS:
+        return None
+    return content
+
+
+def parse_slide_block(block: str) -> Tuple[Optional[str], List[str]]:
+    """Pull the raw title and bullet lines out of one "Slide N" block"""
+    title = None
+    title_match = re.search(r'Title:\s*(.+?)(?:\n|$)', block, re.IGNORECASE)
+    if title_match:
+        title = title_match.group(1).strip()
+
+    content_lines = []
+    for line in block.split('\n'):
+        line = line.strip()
+        if not line or 'title:' in line.lower():
+            continue
+        if line.startswith(('-', '•', '*')):
+            content = _clean_bullet(line.lstrip('-•*'))
+            if content:
+                content_lines.append(content)
+
+    return title, content_lines
+
+
+def slide_from_json(obj: Dict) -> Tuple[Optional[str], List[str]]:
+    """(title, content lines) of one {"title", "content"} object"""
+    if not isinstance(obj, dict):
+        return None, []
+    title = obj.get("title") if isinstance(obj.get("title"), str) else ""
+    title = title.strip() or None
+    bullets = obj.get("content") if isinstance(obj.get("content"), list) else []
+    content_lines = [line for line in (_clean_bullet(b) for b in bullets if isinstance(b, str)) if line]
+    return title, content_lines
+
+
+def parse_slides_json(text: str) -> List[Tuple[Optional[str], List[str]]]:
+    """All slides of a {"slides": [...]} response.
+
+    A completion cut off by the token budget is not valid JSON; every slide
+    object that was closed before the cut is still recovered.
+    """
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict) and isinstance(data.get("slides"), list):
+            return [slide_from_json(obj) for obj in data["slides"]]
+    except ValueError:
+        pass
+
+    parser = JsonSlideStreamParser()
+    parser.feed(text)
+    return parser.slides
+
+
+def is_well_formed(content_lines: List[str]) -> bool:
+    """Same bar the batch parsers use before accepting a slide"""
+    return len(content_lines) >= 2
+
+
+class SlideStreamParser:
+    """Incrementally split streamed model output into finished slide blocks.
+
+    A block counts as finished once the next "Slide N" header arrives (or the
+    stream ends), so a slide is never emitted with half its bullets.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._consumed = 0  # offset of the first header not yet emitted
+
+    def feed(self, chunk: str) -> List[Tuple[Optional[str], List[str]]]:
+        """Add decoded text, return blocks completed by it"""
+        self.text += chunk
+
+        # Only scan from the last unfinished block onwards
+        headers = [m.start() for m in SLIDE_HEADER.finditer(self.text, self._consumed)]
+        if len(headers) < 2:
+            return []
+
+        finished = []
+        for start, end in zip(headers, headers[1:]):
+            finished.append(self._block(start, end))
+        self._consumed = headers[-1]
+        return [block for block in finished if is_well_formed(block[1])]
+
+    def finish(self) -> List[Tuple[Optional[str], List[str]]]:
+        """Flush the trailing block once the stream is over"""
+        match = SLIDE_HEADER.search(self.text, self._consumed)
+        if not match:
+            return []
+
+        block = self._block(match.start(), len(self.text))
+        self._consumed = len(self.text)
+        return [block] if is_well_formed(block[1]) else []
+
+    def _block(self, start: int, end: int) -> Tuple[Optional[str], List[str]]:
+        # Drop the header itself so "Slide 2" can't be mistaken for content
+        header = SLIDE_HEADER.match(self.text, start)
+        return parse_slide_block(self.text[header.end():end])
+
+
+class JsonSlideStreamParser:
+    """SlideStreamParser counterpart for constrained JSON output.
+
+    A slide is finished as soon as its object closes; everything before the
+    slides array and between objects is skipped.
+    """
+
+    _SEPARATOR = re.compile(r'[\s,]*')
+
+    def __init__(self):
+        self.text = ""
+        self.slides: List[Tuple[Optional[str], List[str]]] = []
+        self._pos: Optional[int] = None  # offset past the last parsed object
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> List[Tuple[Optional[str], List[str]]]:
+        """Add decoded text, return slides completed by it"""
+        self.text += chunk
+        if self._pos is None:
+            start = self.text.find("[")
+            if start < 0:
+                return []
+            self._pos = start + 1
+
+        finished = []
+        while True:
+            pos = self._SEPARATOR.match(self.text, self._pos).end()
+            if pos >= len(self.text) or self.text[pos] != "{":
+                break
+            try:
+                obj, self._pos = self._decoder.raw_decode(self.text, pos)
+            except ValueError:
+                break  # object still open
+            finished.append(slide_from_json(obj))
+
+        self.slides.extend(finished)
+        return [block for block in finished if is_well_formed(block[1])]
+
+    def finish(self) -> List[Tuple[Optional[str], List[str]]]:
+        """Nothing is pending once the stream ends - an unclosed object is incomplete"""
+        return []
+
+
+def count_complete_slides(text: str) -> int:
+    """How many well-formed slides the text already contains.
+
+    A block is complete when another "Slide N" header follows it. The last
+    block also counts once it has the 3+ bullets the prompts ask for and a
+    blank line closes it, so decoding can stop without waiting for a header
+    that may never come.
+    """
+    headers = list(SLIDE_HEADER.finditer(text))
+    if not headers:
+        return 0
+
+    complete = 0
+    for header, next_header in zip(headers, headers[1:]):
+        _, content_lines = parse_slide_block(text[header.end():next_header.start()])
+        if is_well_formed(content_lines):
+            complete += 1
+
+    last_block = text[headers[-1].end():]
+    if BLOCK_END.search(last_block):
+        _, content_lines = parse_slide_block(last_block)
+        if len(content_lines) >= 3:
+            complete += 1
+
+    return complete
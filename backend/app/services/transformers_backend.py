@@ -0,0 +1,349 @@
+import time
+_import_started = time.perf_counter()
+
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList, LogitsProcessorList
+import torch
+import os
+import contextvars
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Iterator
+from threading import Event, Thread
+from app.services.inference_backend import InferenceBackend, MAX_NEW_TOKENS, token_budget
+from app.services.prefix_cache import PrefixCache
+from app.services.quantization import load_int8_model
+from app.services.autotune import resolve_tuning, DTYPES
+from app.services.slide_parser import count_complete_slides
+from app.services.constrained_decoding import TokenVocabulary, SlideJsonLogitsProcessor
+from app.services.checkpoint_cache import find_checkpoint, load_checkpoint
+from app.services.instrumentation import stage, record
+
+# torch + transformers dominate cold start before any weights are read
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+PREFIX_CACHE_ENABLED = os.getenv("PREFIX_CACHE", "1") == "1"
+
+# "int8" = dynamically quantized Linear layers (CPU only, opt-in)
+QUANTIZE_MODE = os.getenv("AI_QUANTIZE", "").lower()
+
+class CancelCriteria(StoppingCriteria):
+    """Stops a running generate() once the consumer has what it needs"""
+
+    def __init__(self, event: Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.event.is_set()
+
+class FirstTokenTimer(StoppingCriteria):
+    """Notes when the first token is out, splitting prefill from decode time"""
+
+    def __init__(self):
+        self.at: Optional[float] = None
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        if self.at is None:
+            self.at = time.perf_counter()
+        return False
+
+class SlideCountCriteria(StoppingCriteria):
+    """Stops each row once it holds the requested number of finished slides.
+
+    Re-decodes a row's completion every `check_every` tokens, so the cost
+    stays small next to a forward pass. Rows also stop at their own token
+    budget when batched with larger requests.
+    """
+
+    def __init__(self, tokenizer, prompt_len: int, targets: List[int], check_every: int = 8):
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.targets = targets
+        self.budgets = [token_budget(target) for target in targets]
+        self.check_every = check_every
+        self.done = torch.zeros(len(targets), dtype=torch.bool)
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        generated = input_ids.shape[1] - self.prompt_len
+        if generated % self.check_every:
+            return self.done.clone()
+
+        for row, target in enumerate(self.targets):
+            if self.done[row]:
+                continue
+            if generated >= self.budgets[row]:
+                self.done[row] = True
+                continue
+            text = self.tokenizer.decode(input_ids[row, self.prompt_len:], skip_special_tokens=True)
+            if count_complete_slides(text) >= target:
+                self.done[row] = True
+
+        return self.done.clone()
+
+class TransformersBackend(InferenceBackend):
+    """In-process Hugging Face transformers model on CPU"""
+
+    def __init__(self):
+        print("🔄 Loading Qwen 2.5 3B model (better quality, no login needed)...")
+        self.startup_seconds = {"imports": round(IMPORT_SECONDS, 2)}
+
+        # BEST MODEL - No authentication required, excellent quality
+        model_name = "Qwen/Qwen2.5-3B-Instruct"
+
+        try:
+            self._load_model(model_name, trust_remote_code=True)
+            print("✅ Qwen 2.5 3B model ready!")
+
+        except Exception as e:
+            print(f"⚠️  Qwen failed: {e}")
+            print("🔄 Falling back to TinyLlama...")
+
+            # Ultimate fallback - TinyLlama (always works)
+            self._load_model("TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+            print("✅ TinyLlama model ready (fallback)")
+
+        # Batched generation needs a pad token and left padding so every
+        # prompt ends right where decoding starts
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+        self.context_window = getattr(self.model.config, "max_position_embeddings", None) or 2048
+
+        # System message + format instructions are identical for every
+        # request, so their KV is computed once and reused
+        self.prefix_cache = PrefixCache(self.model, self.tokenizer) if PREFIX_CACHE_ENABLED else None
+
+        # Token texts for the JSON grammar, built on first structured request
+        self._vocabulary: Optional[TokenVocabulary] = None
+
+        phases = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.startup_seconds.items())
+        print(f"⏱️  Startup phases: {phases}")
+
+    @contextmanager
+    def _phase(self, name: str):
+        """Record how long one startup phase took (in startup_seconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_seconds[name] = round(time.perf_counter() - start, 2)
+
+    def _load_model(self, model_name: str, trust_remote_code: bool = False):
+        """Load tokenizer and weights for one model id"""
+        # fp16 is the historical default; a stored autotune result for this
+        # host overrides both dtype and intra-op thread count
+        dtype_name = "float16"
+        with self._phase("autotune"):
+            tuning = resolve_tuning(model_name, trust_remote_code)
+        if tuning:
+            dtype_name = tuning["dtype"]
+            torch.set_num_threads(tuning["threads"])
+            print(f"🎛️  Autotuned: {dtype_name} with {tuning['threads']} threads")
+
+        # A pre-converted checkpoint is memory-mapped (tokenizer included);
+        # otherwise load from the hub cache and cast as before
+        checkpoint = find_checkpoint(model_name, dtype_name) if QUANTIZE_MODE != "int8" else None
+        if checkpoint:
+            with self._phase("weights"):
+                self.model, self.tokenizer = load_checkpoint(checkpoint, trust_remote_code)
+            weights = "mmap"
+            print(f"⚡ Memory-mapped {checkpoint}")
+        else:
+            with self._phase("tokenizer"):
+                self.tokenizer = AutoTokenizer.from_pretrained(
+                    model_name,
+                    trust_remote_code=trust_remote_code
+                )
+
+            with self._phase("weights"):
+                if QUANTIZE_MODE == "int8":
+                    self.model = load_int8_model(model_name, trust_remote_code)
+                    dtype_name = "int8"
+                    weights = "int8"
+                else:
+                    self.model = AutoModelForCausalLM.from_pretrained(
+                        model_name,
+                        torch_dtype=DTYPES[dtype_name],
+                        device_map="cpu",
+                        trust_remote_code=trust_remote_code,
+                        low_cpu_mem_usage=True
+                    )
+                    weights = "from_pretrained"
+
+        self.model_name = model_name
+        self.runtime = {
+            "backend": "transformers",
+            "dtype": dtype_name,
+            "threads": torch.get_num_threads(),
+            "autotuned": tuning is not None,
+            "weights": weights
+        }
+
+    def warmup(self, prompts: List[Dict], structured: bool = False):
+        """Run a tiny generation and compute the KV of every static prefix"""
+        hello = {"system": "You are a helpful assistant.", "static": "", "variable": "Say hello."}
+        self.generate([hello], temperature=0.0, max_new_tokens=4)
+
+        if structured:
+            self._json_vocabulary()
+
+        if self.prefix_cache:
+            for prompt in prompts:
+                self.prefix_cache.get(self._split_prompt(prompt)[0])
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def _json_vocabulary(self) -> TokenVocabulary:
+        if self._vocabulary is None:
+            eos = self.model.generation_config.eos_token_id
+            eos = eos if isinstance(eos, list) else [eos]
+            self._vocabulary = TokenVocabulary(self.tokenizer, [e for e in eos + [self.tokenizer.eos_token_id] if e is not None])
+        return self._vocabulary
+
+    def _chat_text(self, system: str, user: str) -> str:
+        """Render a system + user message with the model's chat template"""
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ]
+        return self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+
+    def _split_prompt(self, prompt: Dict) -> Tuple[str, str]:
+        """Chat-formatted prompt split into (static prefix, variable tail).
+
+        The prefix runs up to the end of the static part and is identical
+        across requests, which is what lets PrefixCache reuse its KV.
+        """
+        static = prompt["static"]
+        text = self._chat_text(prompt["system"], static + prompt["variable"])
+        split = text.index(static) + len(static)
+        return text[:split], text[split:]
+
+    def _prepare_inputs(self, prompts: List[Dict]) -> Dict:
+        """Tokenize prompts, reusing cached prefix KV when they share one"""
+        split = [self._split_prompt(prompt) for prompt in prompts]
+        prefix = split[0][0]
+        if self.prefix_cache and prefix and all(p == prefix for p, _ in split):
+            return self.prefix_cache.build_inputs(prefix, [tail for _, tail in split])
+
+        return self.tokenizer([p + tail for p, tail in split], return_tensors="pt", padding=True)
+
+    def generate(self, prompts: List[Dict], temperature: float, slide_targets: Optional[List[int]] = None, max_new_tokens: Optional[int] = None, structured: bool = False) -> Tuple[List[str], int]:
+        """Run one left-padded generate call for all prompts.
+
+        With slide_targets, each row stops as soon as it holds that many
+        finished slides and the batch gets only the token budget they need.
+        With structured, a grammar mask keeps every row inside the JSON
+        slide schema and the row ends with EOS once its JSON is complete.
+        Returns the decoded completions (prompt stripped) and the number of
+        tokens actually generated across the batch.
+        """
+        inputs, input_tokens = self._tokenize(prompts)
+        prompt_len = inputs["input_ids"].shape[1]
+
+        first_token = FirstTokenTimer()
+        stopping_criteria = StoppingCriteriaList([first_token])
+        logits_processor = None
+        if slide_targets:
+            if structured:
+                logits_processor = LogitsProcessorList([
+                    SlideJsonLogitsProcessor(self._json_vocabulary(), prompt_len, slide_targets)
+                ])
+            else:
+                stopping_criteria.append(SlideCountCriteria(self.tokenizer, prompt_len, slide_targets))
+            max_new_tokens = max_new_tokens or max(token_budget(target) for target in slide_targets)
+
+        started = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                stopping_criteria=stopping_criteria,
+                logits_processor=logits_processor,
+                max_new_tokens=max_new_tokens or MAX_NEW_TOKENS,
+                temperature=temperature if temperature > 0 else None,
+                do_sample=temperature > 0,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+
+        new_tokens = outputs[:, prompt_len:]
+        generated = int((new_tokens != self.tokenizer.pad_token_id).sum())
+        self._record_decode(started, first_token.at, input_tokens, generated)
+        with stage("detokenize"):
+            responses = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+        return [r.strip() for r in responses], generated
+
+    def _tokenize(self, prompts: List[Dict]) -> Tuple[Dict, Dict]:
+        """Model inputs plus prompt token counts (cached = served by the prefix KV)"""
+        with stage("tokenize") as counts:
+            inputs = self._prepare_inputs(prompts)
+            cache = inputs.get("past_key_values")
+            counts["input_tokens"] = int(inputs["attention_mask"].sum())
+            counts["cached_tokens"] = cache.get_seq_length() * len(prompts) if cache is not None else 0
+        return inputs, counts
+
+    def _record_decode(self, started: float, first_token_at: Optional[float], input_tokens: Dict, generated: int):
+        """Split one generate() into prefill (up to the first token) and decode"""
+        ended = time.perf_counter()
+        first = first_token_at or ended
+        record("prefill", first - started, **input_tokens)
+        record("decode", ended - first, output_tokens=generated)
+
+    def stream(self, prompt: Dict, temperature: float, num_slides: int, structured: bool = False) -> Iterator[str]:
+        """Yield decoded text chunks while generate() runs in a background thread"""
+        inputs, input_tokens = self._tokenize([prompt])
+        prompt_len = inputs["input_ids"].shape[1]
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        cancel = Event()
+        first_token = FirstTokenTimer()
+        stopping_criteria = StoppingCriteriaList([CancelCriteria(cancel), first_token])
+        logits_processor = None
+        if structured:
+            logits_processor = LogitsProcessorList([
+                SlideJsonLogitsProcessor(self._json_vocabulary(), prompt_len, [num_slides])
+            ])
+        else:
+            stopping_criteria.append(SlideCountCriteria(self.tokenizer, prompt_len, [num_slides]))
+
+        def run():
+            try:
+                started = time.perf_counter()
+                with torch.no_grad():
+                    outputs = self.model.generate(
+                        **inputs,
+                        streamer=streamer,
+                        stopping_criteria=stopping_criteria,
+                        logits_processor=logits_processor,
+                        max_new_tokens=token_budget(num_slides),
+                        temperature=temperature if temperature > 0 else None,
+                        do_sample=temperature > 0,
+                        pad_token_id=self.tokenizer.pad_token_id
+                    )
+                generated = int((outputs[:, prompt_len:] != self.tokenizer.pad_token_id).sum())
+                self._record_decode(started, first_token.at, input_tokens, generated)
+            except Exception as e:
+                # Unblock the consumer instead of leaving it waiting forever
+                print(f"❌ Streaming generation failed: {e}")
+                streamer.end()
+
+        # Same request context (trace) in the decoding thread
+        thread = Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+        thread.start()
+        try:
+            for chunk in streamer:
+                yield chunk
+        finally:
+            # Consumer stopped early (enough slides or client gone) - stop decoding
+            cancel.set()
+            for _ in streamer:
+                pass
+            thread.join()
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "transformers",
+            "prefix_cache": self.prefix_cache.stats() if self.prefix_cache else None,
+            "json_grammar": self._vocabulary is not None
+        }
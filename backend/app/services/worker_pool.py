@@ -0,0 +1,281 @@
+import asyncio
+import contextvars
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+_DONE = object()
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised instead of queueing more work than a pool accepts"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """Bounded executor for blocking stages, kept off the event loop.
+
+    At most `max_workers` calls run at once and `max_queue` more may wait;
+    beyond that `run` raises PoolSaturatedError so the API can answer 503
+    with Retry-After instead of piling up requests. Calls run inside a copy
+    of the caller's contextvars.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+
+        self.pending = 0  # queued + running
+        self.running = 0
+        self.submitted_total = 0
+        self.rejected_total = 0
+        self.failed_total = 0
+        self.completed_total = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.running)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the average call time"""
+        avg_run = self.run_seconds / self.completed_total if self.completed_total else 5.0
+        return min(60, max(1, math.ceil(avg_run * (self.queued + 1) / self.max_workers)))
+
+    def check_capacity(self):
+        """Raise PoolSaturatedError if another call would be rejected"""
+        if self.pending >= self.max_workers + self.max_queue:
+            with self._lock:
+                self.rejected_total += 1
+            raise PoolSaturatedError(f"Server busy ({self.name} queue full), try again shortly", self.retry_after())
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        """Hand one call to the executor, tracking queue wait and run time"""
+        context = contextvars.copy_context()
+        enqueued = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            self.submitted_total += 1
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.wait_seconds += started - enqueued
+            try:
+                return context.run(fn, *args)
+            except BaseException:
+                with self._lock:
+                    self.failed_total += 1
+                raise
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.pending -= 1
+                    self.completed_total += 1
+                    self.run_seconds += time.perf_counter() - started
+
+        try:
+            return self._executor.submit(call)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+    async def run(self, fn: Callable, *args, admit: bool = True):
+        """Run fn(*args) on the pool and await the result.
+
+        admit=False skips the queue limit, for work that was already
+        admitted elsewhere (e.g. a batch assembled by the scheduler).
+        """
+        if admit:
+            self.check_capacity()
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def stream(self, iterator: Iterator) -> AsyncIterator:
+        """Admit a streaming response and drive its blocking iterator on one worker.
+
+        Raises PoolSaturatedError right away, while a 503 can still be sent.
+        The whole iteration runs as a single pool call, so the stream holds
+        one of the max_workers slots (and counts toward check_capacity)
+        from admission until the iterator is exhausted or the client goes
+        away - streams and other calls together never exceed the bound.
+        """
+        self.check_capacity()
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def hand_over(item, error: Optional[BaseException] = None):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, (item, error))
+            except RuntimeError:
+                # Event loop already closed (server shutting down)
+                pass
+
+        def drain():
+            error = None
+            try:
+                for item in iterator:
+                    hand_over(item)
+                    if stop.is_set():
+                        break
+            except BaseException as e:
+                error = e
+            finally:
+                # Client gone or stream done: clean up on this worker, which
+                # stays taken until e.g. a decode thread has been joined
+                close = getattr(iterator, "close", None)
+                if close:
+                    close()
+                hand_over(_DONE, error)
+
+        self._submit(drain)
+
+        async def consume() -> AsyncIterator:
+            try:
+                while True:
+                    item, error = await items.get()
+                    if item is _DONE:
+                        if error is not None:
+                            raise error
+                        return
+                    yield item
+            finally:
+                stop.set()
+
+        return consume()
+
+    def stats(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "submitted": self.submitted_total,
+            "rejected": self.rejected_total,
+            "failed": self.failed_total,
+            "avg_wait_ms": round(self.wait_seconds / self.completed_total * 1000, 1) if self.completed_total else 0,
+            "avg_run_ms": round(self.run_seconds / self.completed_total * 1000, 1) if self.completed_total else 0
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Model calls (batched topic decodes, chapter batches, SSE streams)
+inference_pool = WorkerPool(
+    "inference",
+    max_workers=int(os.getenv("INFERENCE_WORKERS", "2")),
+    max_queue=int(os.getenv("INFERENCE_QUEUE", "8"))
+)
+
+# PDF extraction/OCR, PPTX rendering and LibreOffice conversion
+cpu_pool = WorkerPool(
+    "cpu",
+    max_workers=int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv("CPU_QUEUE", "16"))
+)
+
+def available_cpus() -> int:
+    """Cores this process may run on (respects CPU affinity where supported)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# CPU-bound work that holds the GIL (PDF parsing, OCR) fans out to processes.
+# Created on first use; forkserver/spawn, since forking a threaded server
+# can deadlock the child
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", str(available_cpus())))
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+process_pool_restarts = 0
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _process_pool = ProcessPoolExecutor(max(1, PROCESS_WORKERS), mp_context=context)
+        return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def process_pool_stats() -> Dict:
+    return {"max_workers": max(1, PROCESS_WORKERS), "started": _process_pool is not None, "restarts": process_pool_restarts}
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop a pool that lost a worker, unless another caller already replaced it"""
+    global _process_pool, process_pool_restarts
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return
+        _process_pool = None
+        process_pool_restarts += 1
+    print("⚠️  A worker process died - replacing the process pool")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_to_process(fn: Callable, *args) -> Future:
+    """Run fn(*args) on the process pool.
+
+    A worker that dies (OOM kill, a crash in a C extension) breaks the
+    whole ProcessPoolExecutor: the calls in flight and every later submit
+    fail with BrokenProcessPool. The broken pool is then replaced and the
+    call retried once on the new one.
+    """
+    result: Future = Future()
+
+    def attempt(retries: int):
+        pool = get_process_pool()
+        try:
+            call = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            _discard_process_pool(pool)
+            if not retries:
+                raise
+            return attempt(retries - 1)
+
+        def finished(call: Future):
+            try:
+                result.set_result(call.result())
+            except BrokenProcessPool as e:
+                _discard_process_pool(pool)
+                if not retries:
+                    result.set_exception(e)
+                    return
+                try:
+                    attempt(retries - 1)
+                except BaseException as retry_error:
+                    result.set_exception(retry_error)
+            except BaseException as e:
+                result.set_exception(e)
+
+        call.add_done_callback(finished)
+
+    attempt(1)
+    return result
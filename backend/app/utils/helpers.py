@@ -1,4 +1,5 @@
 import os
+import hashlib
 import uuid
 from datetime import datetime
 
@@ -16,4 +17,28 @@ def clean_text(text: str) -> str:
 
 def ensure_dir(directory: str):
     """Ensure directory exists"""
-    os.makedirs(directory, exist_ok=True)
\ No newline at end of file
+    os.makedirs(directory, exist_ok=True)
+
+def file_sha256(path: str) -> str:
+    """Hex sha256 of a file's contents, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    
+    # Non-Linux fallback: peak RSS is the best we can get cheaply
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024